@@ -0,0 +1,101 @@
+# ages.py  (age derived from date_of_birth, kept current by an incremental job)
+#
+# Each profile stores its age plus age_next_update: the date of its next
+# birthday. A refresh only selects rows whose age_next_update has passed
+# (an index range scan), so a daily run touches ~1/365 of the profiles,
+# and age stays a plain indexed column for range filters.
+
+import os
+import time
+import logging
+from datetime import date
+
+import offload
+
+AGE_REFRESH_INTERVAL = int(os.getenv("AGE_REFRESH_INTERVAL", "3600"))
+MIN_AGE, MAX_AGE = 18, 100
+TABLES = ("Bride_profile", "Groom_profile")
+
+log = logging.getLogger("jeevansathi")
+
+# -------------------- Date math --------------------
+def parse_dob(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+
+def age_on(dob, today):
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+def next_birthday(dob, today):
+    # 29 Feb birthdays fall on 1 Mar in other years, matching age_on()
+    for year in (today.year, today.year + 1):
+        try:
+            day = dob.replace(year=year)
+        except ValueError:
+            day = date(year, 3, 1)
+        if day > today:
+            return day
+
+def derive(dob_text, today=None):
+    # (age, age_next_update) for a date_of_birth string, or (None, None)
+    today = today or date.today()
+    dob = parse_dob(dob_text)
+    if dob is None or dob > today:
+        return None, None
+    return age_on(dob, today), next_birthday(dob, today).isoformat()
+
+# -------------------- Refresh --------------------
+def refresh_ages(cursor, today=None, batch=1000):
+    # Rows never derived yet (new imports, legacy data) and rows whose
+    # birthday has passed. Version bumps so cached cards / ETags refresh.
+    today = today or date.today()
+    parked = date(today.year + 1, today.month, 1).isoformat()
+    updated = 0
+    for table in TABLES:
+        cursor.execute(f"""
+            SELECT id, date_of_birth FROM {table}
+            WHERE age_next_update <= ?
+               OR (age_next_update IS NULL AND date_of_birth IS NOT NULL AND date_of_birth != '')
+        """, (today.isoformat(),))
+        due = cursor.fetchall()
+        for start in range(0, len(due), batch):
+            changes = []
+            for row_id, dob_text in due[start:start + batch]:
+                age, next_update = derive(dob_text, today)
+                # Unparseable or implausible dates (older rows took age straight
+                # from the form) keep their stored age and are parked a year out
+                if age is None or not MIN_AGE <= age <= MAX_AGE:
+                    age, next_update = None, parked
+                changes.append((age, next_update, row_id))
+            cursor.executemany(f"""
+                UPDATE {table}
+                SET age = COALESCE(?, age), age_next_update = ?, version = version + 1
+                WHERE id = ?
+            """, changes)
+        updated += len(due)
+    return updated
+
+def _refresh_pass(connect):
+    conn = connect()
+    try:
+        updated = refresh_ages(conn.cursor())
+        conn.commit()
+        return updated
+    finally:
+        conn.close()
+
+def run_age_job(connect, sleep=time.sleep, interval=AGE_REFRESH_INTERVAL):
+    # Background loop; hourly by default so birthdays roll over soon after
+    # midnight without caring when the process started. Passes run off the hub.
+    while True:
+        try:
+            updated = offload.run_blocking(_refresh_pass, connect)
+            if updated:
+                log.info("age refresh updated %d profiles", updated)
+        except Exception as e:
+            log.exception("age refresh failed: %s", e)
+        sleep(interval)
@@ -1,46 +1,100 @@
 # main.py  (PART 1/2)
 
+import io
 import os
 import re
+import sys
+import hmac
 import json
+import time
+import atexit
 import sqlite3
-from datetime import datetime, date
 from werkzeug.utils import secure_filename
 
 from flask import (
     Flask, render_template, request, redirect, url_for,
-    flash, jsonify, send_from_directory, session
+    flash, jsonify, send_from_directory, session,
+    Response, stream_with_context
 )
 from flask_cors import CORS
+from markupsafe import Markup
 from flask_socketio import SocketIO
 
 from dotenv import load_dotenv
-from groq import Groq
+
+import ages
+import auth
+import chat_writer
+import geo
+import json_api
+import metrics
+import offload
+import profile_io
+import quota
+import message_store
+import session_store
+from fragment_cache import card_cache
 
 # -------------------- App Config --------------------
+# .env has to be loaded before any module-level os.getenv() (here and in
+# auth, metrics, session_store, ...); everything else waits for create_app()
 load_dotenv()
 
 app = Flask(__name__, template_folder="templates", static_folder="static")
 app.secret_key = os.getenv("SECRET_KEY", "change_this_secret")
 app.config["UPLOAD_FOLDER"] = "uploads"
 
-CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = SocketIO()
 
 # -------------------- Groq Client (Kundli) --------------------
+# Built on first use; importing the SDK alone costs more than the rest of startup
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+_groq_client = None
+
+def get_groq_client():
+    global _groq_client
+    if _groq_client is None and GROQ_API_KEY:
+        from groq import Groq
+        _groq_client = Groq(api_key=GROQ_API_KEY)
+    return _groq_client
 
 # -------------------- Helpers --------------------
+DB_PATH = os.getenv("DATABASE_PATH", "jeevansathi.db")
+
+def connect_db():
+    # Every statement is timed and counted against the current request. Under
+    # gevent, lock waits inside SQLite are capped at SQLITE_GREEN_BUSY_MS and the
+    # rest of the wait yields to the hub (offload.retry_busy)
+    return sqlite3.connect(DB_PATH, timeout=offload.sqlite_timeout(), factory=metrics.InstrumentedConnection)
+
 def get_db():
-    conn = sqlite3.connect("jeevansathi.db")
+    conn = connect_db()
     conn.row_factory = sqlite3.Row
     return conn
 
+def session_user():
+    # Username proven by a password login in this session, else None. Nothing
+    # else is kept in the session, so anonymous page views never write a row.
+    return session.get("username")
+
+# Stored in PRAGMA user_version by init_db(); bump it whenever init_db() changes
+SCHEMA_VERSION = 5
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0") == "1"
+
+def schema_version():
+    conn = connect_db()
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    conn.close()
+    return version
+
 def init_db():
     conn = get_db()
     c = conn.cursor()
 
+    # WAL (persistent in the db file): readers never wait on the single writer,
+    # so a slow commit doesn't hold up every other request on the worker
+    c.execute("PRAGMA journal_mode=WAL")
+
     # Bride
     c.execute("""
         CREATE TABLE IF NOT EXISTS Bride_profile (
@@ -67,7 +121,11 @@ def init_db():
             package TEXT,
             education TEXT,
             likes TEXT,
-            dislikes TEXT
+            dislikes TEXT,
+            version INTEGER NOT NULL DEFAULT 0,
+            location_id INTEGER,   -- gazetteer.json id resolved from city/state
+            age_next_update TEXT,  -- next birthday; ages.refresh_ages() bumps age then
+            plan TEXT NOT NULL DEFAULT 'free'   -- membership tier, see quota.PLAN_LIMITS
         )
     """)
 
@@ -97,7 +155,11 @@ def init_db():
             package TEXT,
             education TEXT,
             likes TEXT,
-            dislikes TEXT
+            dislikes TEXT,
+            version INTEGER NOT NULL DEFAULT 0,
+            location_id INTEGER,   -- gazetteer.json id resolved from city/state
+            age_next_update TEXT,  -- next birthday; ages.refresh_ages() bumps age then
+            plan TEXT NOT NULL DEFAULT 'free'   -- membership tier, see quota.PLAN_LIMITS
         )
     """)
 
@@ -112,6 +174,43 @@ def init_db():
         )
     """)
 
+    # Columns added after the first release; older databases get them here
+    _ensure_column(c, "Bride_profile", "version", "INTEGER NOT NULL DEFAULT 0")
+    _ensure_column(c, "Groom_profile", "version", "INTEGER NOT NULL DEFAULT 0")
+    if _ensure_column(c, "Requests", "status", "TEXT"):
+        c.execute("UPDATE Requests SET status = status_sender WHERE status IS NULL")
+
+    # Location ids for "within N km" search; rows whose city was unknown are
+    # retried every start, so gazetteer additions reach existing profiles
+    for table in ("Bride_profile", "Groom_profile"):
+        _ensure_column(c, table, "location_id", "INTEGER")
+        # (location_id, age) serves location-only and location + age-range filters
+        c.execute(f"DROP INDEX IF EXISTS idx_{table.lower()}_location")
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_location_age ON {table} (location_id, age)")
+        c.execute(f"SELECT DISTINCT city, state FROM {table} WHERE location_id IS NULL AND city IS NOT NULL")
+        for city, state in c.fetchall():
+            location_id = geo.resolve(city, state)
+            if location_id is not None:
+                c.execute(f"UPDATE {table} SET location_id = ? WHERE location_id IS NULL AND city = ? AND state IS ?",
+                          (location_id, city, state))
+
+    # Every page view looks profiles up by username
+    for table in ("Bride_profile", "Groom_profile"):
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_username ON {table} (username)")
+
+    # Ages derived from date_of_birth; the refresh only visits rows whose
+    # birthday passed (or that were never derived), see ages.py
+    for table in ("Bride_profile", "Groom_profile"):
+        _ensure_column(c, table, "age_next_update", "TEXT")
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_age_next_update ON {table} (age_next_update)")
+        c.execute(f"CREATE INDEX IF NOT EXISTS idx_{table.lower()}_age ON {table} (age)")
+    ages.refresh_ages(c)
+
+    # Membership tier behind the daily quotas, and the counters themselves
+    for table in ("Bride_profile", "Groom_profile"):
+        _ensure_column(c, table, "plan", "TEXT NOT NULL DEFAULT 'free'")
+    quota.init_quota_table(c)
+
     # Messages
     c.execute("""
         CREATE TABLE IF NOT EXISTS Messages (
@@ -125,11 +224,206 @@ def init_db():
         )
     """)
 
+    # Conversations  (one summary row per room per participant, kept in sync by save_message)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Conversations (
+            room_id TEXT NOT NULL,
+            username TEXT NOT NULL,
+            peer TEXT NOT NULL,
+            last_sender TEXT,
+            last_message TEXT,
+            last_date TEXT,
+            last_time TEXT,
+            unread_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (room_id, username)
+        )
+    """)
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_conversations_user
+        ON Conversations (username, last_date, last_time)
+    """)
+
+    # Compact chat storage; drain the legacy Messages table into it
+    message_store.init_message_tables(c)
+    message_store.migrate_legacy_messages(c)
+
+    # Server-side sessions
+    session_store.init_session_table(c)
+
+    # Write-behind chat log bookkeeping
+    chat_writer.init_writer_table(c)
+
+    # Top-N matches per user, rebuilt offline by recommend.py
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS Recommendations (
+            username TEXT NOT NULL,
+            rank INTEGER NOT NULL,
+            candidate TEXT NOT NULL,
+            score REAL NOT NULL,
+            PRIMARY KEY (username, rank)
+        ) WITHOUT ROWID
+    """)
+
+    # Backfill summaries for rooms that existed before the Conversations table
+    c.execute("SELECT COUNT(*) FROM Conversations")
+    if c.fetchone()[0] == 0:
+        for room_id, sender, receiver, message, ts in message_store.iter_all_messages(c):
+            m_date, m_time = message_store.split_ts(ts)
+            _upsert_conversation(c, room_id, sender, receiver, message, m_date, m_time)
+
+    c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     conn.commit()
     conn.close()
 
-os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
-init_db()
+def _ensure_column(cursor, table, column, decl):
+    cursor.execute(f"PRAGMA table_info({table})")
+    if any(row[1].lower() == column.lower() for row in cursor.fetchall()):
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+    return True
+
+def _upsert_conversation(cursor, room_id, sender, receiver, message, m_date, m_time):
+    # Sender's row: latest message, nothing unread for them
+    cursor.execute("""
+        INSERT INTO Conversations (room_id, username, peer, last_sender, last_message, last_date, last_time, unread_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+        ON CONFLICT (room_id, username) DO UPDATE SET
+            peer = excluded.peer,
+            last_sender = excluded.last_sender,
+            last_message = excluded.last_message,
+            last_date = excluded.last_date,
+            last_time = excluded.last_time
+    """, (room_id, sender, receiver, sender, message, m_date, m_time))
+
+    # Receiver's row: latest message, one more unread
+    cursor.execute("""
+        INSERT INTO Conversations (room_id, username, peer, last_sender, last_message, last_date, last_time, unread_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+        ON CONFLICT (room_id, username) DO UPDATE SET
+            peer = excluded.peer,
+            last_sender = excluded.last_sender,
+            last_message = excluded.last_message,
+            last_date = excluded.last_date,
+            last_time = excluded.last_time,
+            unread_count = Conversations.unread_count + 1
+    """, (room_id, receiver, sender, sender, message, m_date, m_time))
+
+def _write_messages(cursor, records):
+    # One write-behind batch: [room_id, sender, receiver, message, ts] per record
+    for room_id, sender, receiver, message, ts in records:
+        message_store.insert_message(cursor, room_id, sender, receiver, message, ts)
+        m_date, m_time = message_store.split_ts(ts)
+        _upsert_conversation(cursor, room_id, sender, receiver, message, m_date, m_time)
+
+# /save_message buffers here; see chat_writer.py
+message_writer = chat_writer.ChatWriter(connect_db, _write_messages, chat_writer.log_dir_for(DB_PATH))
+
+# -------------------- Quotas --------------------
+def _load_plan(username):
+    conn = connect_db()
+    row = conn.execute("""
+        SELECT plan FROM Bride_profile WHERE username = ?
+        UNION ALL SELECT plan FROM Groom_profile WHERE username = ?
+    """, (username, username)).fetchone()
+    conn.close()
+    return row[0] if row else None
+
+plans = quota.PlanCache(_load_plan)
+
+def _charge(action):
+    # Plan quotas are charged to the logged-in user, never to a name in the URL or body
+    user = session_user()
+    return quota.check(action, user, request.remote_addr, plans.get(user) if user else quota.DEFAULT_PLAN)
+
+def _is_prefetch():
+    purpose = request.headers.get("Sec-Purpose", "") + request.headers.get("Purpose", "")
+    return "prefetch" in purpose.lower()
+
+def _quota_exceeded(message):
+    # Over a daily quota: the membership page, with the reason on top
+    return render_template("subs.html", limits=quota.PLAN_LIMITS, quota_message=message), 429
+
+def _flush_quotas():
+    conn = connect_db()
+    try:
+        quota.counters.flush(conn)
+    finally:
+        conn.close()
+
+# -------------------- App Factory --------------------
+# Importing app.py only defines routes. create_app() wires sessions, metrics,
+# CORS and Socket.IO, and checks the schema with a single PRAGMA; the DDL
+# itself runs in the explicit migrate step:
+#
+#   python app.py migrate        (or: flask --app app migrate)
+#
+# It configures the module-level `app` rather than building a new one, so the
+# supported ways to serve are `python app.py` (dev), serve.py (production) and
+# `flask --app "app:create_app()" run`. A plain `flask --app app run` would
+# find the unconfigured `app`; requests then fail with the hint below.
+_app_ready = False
+
+@app.before_request
+def _require_create_app():
+    if not _app_ready:
+        raise RuntimeError(
+            "app was served without create_app(); use `python app.py`, serve.py "
+            "or `flask --app \"app:create_app()\" run`"
+        )
+
+def create_app(auto_migrate=None, recover_chat_log=True):
+    # recover_chat_log=False: offline scripts that never serve /save_message
+    # leave the chat log (and its replay) to the server
+    global _app_ready
+    if _app_ready:
+        return app
+
+    current = schema_version()
+    if current < SCHEMA_VERSION:
+        if not (AUTO_MIGRATE if auto_migrate is None else auto_migrate):
+            raise RuntimeError(
+                f"database schema is at version {current}, the app needs {SCHEMA_VERSION}; "
+                "run `python app.py migrate` (or set AUTO_MIGRATE=1)"
+            )
+        init_db()
+
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+
+    # Apply chat messages a crash left in the log, flush the buffer on exit
+    if recover_chat_log:
+        message_writer.recover()
+        atexit.register(message_writer.close)
+
+    # Today's quota counts survive restarts
+    conn = connect_db()
+    quota.counters.load(conn.cursor())
+    conn.close()
+    atexit.register(_flush_quotas)
+
+    # Session data lives server-side; the cookie only carries the session id
+    # (static files and uploads skip the store lookup)
+    app.session_interface = session_store.make_session_interface(
+        lambda: connect_db(), skip_prefixes=(app.static_url_path + "/", "/uploads/"))
+
+    # Per-route latency, SQL per request, sampled request logs -> /metrics
+    metrics.init_app(app)
+
+    CORS(app)
+    # async_mode: None lets Flask-SocketIO pick (threading in dev, gevent/eventlet under serve.py)
+    socketio.init_app(app, cors_allowed_origins="*", async_mode=os.getenv("SOCKETIO_ASYNC_MODE") or None)
+
+    _app_ready = True
+    return app
+
+@app.cli.command("migrate", help="Create / upgrade the database schema.")
+def migrate_command():
+    init_db()
+    print(f"schema at version {SCHEMA_VERSION}")
+
+# -------------------- Metrics --------------------
+@app.route("/metrics")
+def metrics_endpoint():
+    return metrics.render_metrics(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
 
 # -------------------- Static Uploads --------------------
 @app.route("/uploads/<path:filename>")
@@ -147,7 +441,7 @@ def about():
 
 @app.route("/membership")
 def membership():
-    return render_template("subs.html")
+    return render_template("subs.html", limits=quota.PLAN_LIMITS)
 
 @app.route("/contact")
 def contact():
@@ -183,16 +477,8 @@ def create_bride_profile():
         form = request.form.to_dict()
         username = form.get("username", "").strip()
 
-        # Age auto-calc
-        age = None
-        dob_str = form.get("dob")
-        if dob_str:
-            try:
-                b = date.fromisoformat(dob_str)
-                t = date.today()
-                age = t.year - b.year - ((t.month, t.day) < (b.month, b.day))
-            except Exception:
-                age = None
+        # Age auto-calc; age_next_update lets the refresh job keep it current
+        age, age_next_update = ages.derive(form.get("dob"))
 
         # User folder
         user_dir = os.path.join(app.config["UPLOAD_FOLDER"], username)
@@ -215,26 +501,31 @@ def create_bride_profile():
             video.save(os.path.join(user_dir, vfn))
             video_rel = os.path.join(username, vfn).replace("\\", "/")
 
+        password = form.get("password")
+        password_hash = auth.hash_password_async(password) if password else None
+
         conn = get_db()
         c = conn.cursor()
         c.execute("""
             INSERT INTO Bride_profile (
                 full_name, email_id, phone_number, country, state, city, address, diet, complexion,
                 height, weight, image, video, username, password, manglik, date_of_birth, age,
-                profession, package, education, likes, dislikes
-            ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+                profession, package, education, likes, dislikes, location_id, age_next_update
+            ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
         """, (
             form.get("full_name"), form.get("email"), form.get("phone"),
             form.get("country"), form.get("state"), form.get("city"),
             form.get("address"), form.get("diet"), form.get("complexion"),
             form.get("height"), form.get("weight"),
-            ",".join(photo_rel_paths), video_rel, username, form.get("password"),
+            ",".join(photo_rel_paths), video_rel, username, password_hash,
             form.get("manglik"), form.get("dob"), age,
             form.get("profession"), form.get("package"), form.get("education"),
-            form.get("likes"), form.get("dislikes")
+            form.get("likes"), form.get("dislikes"),
+            geo.resolve(form.get("city"), form.get("state")), age_next_update
         ))
         conn.commit()
         conn.close()
+        card_cache.invalidate("bride", username)
 
         flash("Bride profile created successfully!")
         return redirect(url_for("create_bride_profile"))
@@ -248,6 +539,11 @@ def create_groom_profile():
         form = request.form.to_dict()
         username = form.get("username", "").strip()
 
+        # Age from date of birth, like brides; the form's age only without one
+        age, age_next_update = ages.derive(form.get("dob"))
+        if age is None:
+            age = form.get("age")
+
         user_dir = os.path.join(app.config["UPLOAD_FOLDER"], username)
         os.makedirs(user_dir, exist_ok=True)
 
@@ -266,26 +562,31 @@ def create_groom_profile():
             video.save(os.path.join(user_dir, vfn))
             video_rel = os.path.join(username, vfn).replace("\\", "/")
 
+        password = form.get("password")
+        password_hash = auth.hash_password_async(password) if password else None
+
         conn = get_db()
         c = conn.cursor()
         c.execute("""
             INSERT INTO Groom_profile (
                 full_name, email_id, phone_number, country, state, city, address, diet, complexion,
                 height, weight, image, video, username, password, manglik, date_of_birth, age,
-                profession, package, education, likes, dislikes
-            ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+                profession, package, education, likes, dislikes, location_id, age_next_update
+            ) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
         """, (
             form.get("full_name"), form.get("email"), form.get("phone"),
             form.get("country"), form.get("state"), form.get("city"),
             form.get("address"), form.get("diet"), form.get("complexion"),
             form.get("height"), form.get("weight"),
-            ",".join(photo_rel_paths), video_rel, username, form.get("password"),
-            form.get("manglik"), form.get("dob"), form.get("age"),
+            ",".join(photo_rel_paths), video_rel, username, password_hash,
+            form.get("manglik"), form.get("dob"), age,
             form.get("profession"), form.get("package"), form.get("education"),
-            form.get("likes"), form.get("dislikes")
+            form.get("likes"), form.get("dislikes"),
+            geo.resolve(form.get("city"), form.get("state")), age_next_update
         ))
         conn.commit()
         conn.close()
+        card_cache.invalidate("groom", username)
 
         flash("Groom profile created successfully!")
         return redirect(url_for("create_groom_profile"))
@@ -300,13 +601,24 @@ def bride_login():
     if not username or not password:
         return jsonify({"success": False, "message": "Username and password are required!"})
 
+    if not auth.login_allowed(username, request.remote_addr):
+        return jsonify({"success": False, "message": "Too many login attempts, please try again later."}), 429
+
     conn = get_db()
     c = conn.cursor()
-    c.execute("SELECT * FROM Bride_profile WHERE username=? AND password=?", (username, password))
+    c.execute("SELECT * FROM Bride_profile WHERE username=?", (username,))
     row = c.fetchone()
+
+    # KDF runs in the bounded worker pool; legacy plaintext rows are upgraded on success
+    # (an unknown username still pays for one KDF run)
+    ok, needs_rehash = (auth.verify_password_async(password, row["password"]) if row
+                        else auth.verify_unknown_user_async(password))
+    if ok and needs_rehash:
+        c.execute("UPDATE Bride_profile SET password=? WHERE id=?", (auth.hash_password_async(password), row["id"]))
+        conn.commit()
     conn.close()
 
-    if not row:
+    if not ok:
         return jsonify({"success": False, "message": "Invalid username or password!"})
 
     profile = dict(row)
@@ -335,7 +647,8 @@ def bride_login():
         "likes": profile.get("likes"),
         "dislikes": profile.get("dislikes"),
     }
-    session["bride_profile"] = profile_out
+    session.regenerate()   # new session id on login (fixation)
+    session["username"] = row["username"]
     return jsonify({"success": True, "profile": profile_out})
 
 @app.route("/groom-login", methods=["POST"])
@@ -345,13 +658,24 @@ def groom_login():
     if not username or not password:
         return jsonify({"success": False, "message": "Username and password are required!"})
 
+    if not auth.login_allowed(username, request.remote_addr):
+        return jsonify({"success": False, "message": "Too many login attempts, please try again later."}), 429
+
     conn = get_db()
     c = conn.cursor()
-    c.execute("SELECT * FROM Groom_profile WHERE username=? AND password=?", (username, password))
+    c.execute("SELECT * FROM Groom_profile WHERE username=?", (username,))
     row = c.fetchone()
+
+    # KDF runs in the bounded worker pool; legacy plaintext rows are upgraded on success
+    # (an unknown username still pays for one KDF run)
+    ok, needs_rehash = (auth.verify_password_async(password, row["password"]) if row
+                        else auth.verify_unknown_user_async(password))
+    if ok and needs_rehash:
+        c.execute("UPDATE Groom_profile SET password=? WHERE id=?", (auth.hash_password_async(password), row["id"]))
+        conn.commit()
     conn.close()
 
-    if not row:
+    if not ok:
         return jsonify({"success": False, "message": "Invalid username or password!"})
 
     profile = dict(row)
@@ -378,7 +702,8 @@ def groom_login():
         "likes": profile.get("likes"),
         "dislikes": profile.get("dislikes"),
     }
-    session["groom_profile"] = profile_out
+    session.regenerate()   # new session id on login (fixation)
+    session["username"] = row["username"]
     return jsonify({"success": True, "profile": profile_out})
 
 # -------------------- Profile Views (Cards + Requests state) --------------------
@@ -392,21 +717,62 @@ def _images_list(csv):
             out.append(url_for("uploaded_file", filename=p))
     return out
 
+def _request_states(cursor, username):
+    # {other username: ("Sender" | "Receiver", status)}; later rows win
+    cursor.execute("SELECT sender, receiver, status FROM Requests WHERE sender = ? OR receiver = ?", (username, username))
+    states = {}
+    for sender, receiver, status in cursor.fetchall():
+        if sender == username:
+            states[receiver] = ("Sender", status)
+        elif receiver == username:
+            states[sender] = ("Receiver", status)
+    return states
+
+def _nearby(location_id, within_km):
+    # {location id: km} for ?within_km=, or None to leave the feed unfiltered
+    # (no usable radius asked for, or the viewer's city isn't in the gazetteer)
+    within_km = geo.clamp_radius(within_km)
+    if within_km is None or location_id is None:
+        return None
+    return geo.within(location_id, within_km)
+
+def _select_candidates(cursor, table, near):
+    if near is None:
+        cursor.execute(f"SELECT * FROM {table}")
+        return cursor.fetchall()
+    marks = ",".join("?" * len(near))
+    cursor.execute(f"SELECT * FROM {table} WHERE location_id IN ({marks})", tuple(near))
+    rows = cursor.fetchall()
+    rows.sort(key=lambda row: near[row[25]])    # nearest first
+    return rows
+
+RECOMMENDED_SHOWN = int(os.getenv("RECOMMENDED_SHOWN", "6"))
+
+def _recommended(cursor, username):
+    # {candidate username: rank} from the last recommend.py run
+    cursor.execute("SELECT candidate, rank FROM Recommendations WHERE username = ? ORDER BY rank LIMIT ?",
+                   (username, RECOMMENDED_SHOWN))
+    return dict(cursor.fetchall())
+
 @app.route("/bride-profile/<username>")
 def bride_profile(username):
+    # Every dashboard render walks all candidates; cap how often one user / IP can ask
+    if not quota.check("dashboard", username, request.remote_addr):
+        return _quota_exceeded("Too many dashboard requests today, please try again tomorrow.")
+
     # Connect to the database and fetch the bride's profile
-    conn = sqlite3.connect("jeevansathi.db")
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM Bride_profile WHERE username = ?", (username,))
     profile = cursor.fetchone()
 
-    # Fetch all groom profiles
-    cursor.execute("SELECT * FROM Groom_profile")
-    grooms = cursor.fetchall()
+    # Fetch all groom profiles, or only those within ?within_km= of this bride
+    within_km = request.args.get("within_km", type=float)
+    grooms = _select_candidates(cursor, "Groom_profile", _nearby(profile[25] if profile else None, within_km))
 
-    # Fetch all requests where the session username is either Sender or Receiver
-    cursor.execute("SELECT * FROM Requests WHERE sender = ? OR receiver = ?", (username, username))
-    requests = cursor.fetchall()
+    # Request state for every user the session username sent to / received from
+    states = _request_states(cursor, username)
+    recommended = _recommended(cursor, username)
     conn.close()
 
     if profile:
@@ -435,50 +801,49 @@ def bride_profile(username):
             "dislikes": profile[23],
         }
 
-        # Map groom profiles to a list of dictionaries
-        groom_profiles = []
+        # Cards are rendered once per (groom, profile version, request state);
+        # the viewer only appears in the markup once a request is approved
+        groom_cards, recommended_cards = [], []
         for groom in grooms:
-            groom_data = {
-                "full_name": groom[1],
-                "country": groom[4],
-                "state": groom[5],
-                "city": groom[6],
-                "diet": groom[8],
-                "complexion": groom[9],
-                "height": groom[10],
-                "weight": groom[11],
-                "manglik": groom[16],
-                "date_of_birth": groom[17],
-                "age": groom[18],
-                "profession": groom[19],
-                "package": groom[20],
-                "education": groom[21],
-                "likes": groom[22],
-                "dislikes": groom[23],
-                "image": groom[12].split(",")[0].replace("\\", "/"),  # Normalize
-                "images": [url_for('uploaded_file', filename=img.replace("\\", "/")) for img in groom[12].split(",") if img],
-                "username": groom[14],
-                "video": groom[13].replace("\\", "/") if groom[13] else None,  # Normalize video path if exists
-                "Sender_status": None,
-                "Send_Or_Receive": None,
-            }
-
-            # Check requests for the current groom
-            for request in requests:
-                if request[1] == username and request[2] == groom[14]:  # Session username is Sender
-                    groom_data["Sender_status"] = request[3]
-                    groom_data["Send_Or_Receive"] = "Sender"
-                elif request[2] == username and request[1] == groom[14]:  # Session username is Receiver
-                    groom_data["Sender_status"] = request[3]
-                    groom_data["Send_Or_Receive"] = "Receiver"
-                
-            print("here is the groom data:", groom_data)
-            groom_profiles.append(groom_data)
-
-        # Store bride profile data in the session
-        session['bride_profile'] = profile_data
-
-        return render_template("bride-profile.html", profile=profile_data, grooms=groom_profiles)
+            send_or_receive, status = states.get(groom[14], (None, None))
+            key = ("groom", groom[14], groom[0], groom[24], send_or_receive, status,
+                   username if status == "Approved" else None)
+            html = card_cache.get(key)
+            if html is None:
+                groom_data = {
+                    "full_name": groom[1],
+                    "country": groom[4],
+                    "state": groom[5],
+                    "city": groom[6],
+                    "diet": groom[8],
+                    "complexion": groom[9],
+                    "height": groom[10],
+                    "weight": groom[11],
+                    "manglik": groom[16],
+                    "date_of_birth": groom[17],
+                    "age": groom[18],
+                    "profession": groom[19],
+                    "package": groom[20],
+                    "education": groom[21],
+                    "likes": groom[22],
+                    "dislikes": groom[23],
+                    "image": groom[12].split(",")[0].replace("\\", "/"),  # Normalize
+                    "images": [url_for('uploaded_file', filename=img.replace("\\", "/")) for img in groom[12].split(",") if img],
+                    "username": groom[14],
+                    "video": groom[13].replace("\\", "/") if groom[13] else None,  # Normalize video path if exists
+                    "Sender_status": status,
+                    "Send_Or_Receive": send_or_receive,
+                }
+                html = Markup(render_template("partials/groom-card.html", groom=groom_data, profile=profile_data))
+                card_cache.set(key, html)
+            if groom[14] in recommended:
+                recommended_cards.append((recommended[groom[14]], html))
+            else:
+                groom_cards.append(html)
+        recommended_cards = [html for _, html in sorted(recommended_cards, key=lambda item: item[0])]
+
+        return render_template("bride-profile.html", profile=profile_data, groom_cards=groom_cards,
+                               recommended_cards=recommended_cards, within_km=within_km)
     else:
         flash("Profile not found!")
         return redirect(url_for("home"))
@@ -486,19 +851,23 @@ def bride_profile(username):
 
 @app.route("/groom-profile/<username>")
 def groom_profile(username):
+    # Every dashboard render walks all candidates; cap how often one user / IP can ask
+    if not quota.check("dashboard", username, request.remote_addr):
+        return _quota_exceeded("Too many dashboard requests today, please try again tomorrow.")
+
     # Connect to the database and fetch the groom's profile
-    conn = sqlite3.connect("jeevansathi.db")
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM Groom_profile WHERE username = ?", (username,))
     profile = cursor.fetchone()
 
-    # Fetch all bride profiles
-    cursor.execute("SELECT * FROM Bride_profile")
-    brides = cursor.fetchall()
+    # Fetch all bride profiles, or only those within ?within_km= of this groom
+    within_km = request.args.get("within_km", type=float)
+    brides = _select_candidates(cursor, "Bride_profile", _nearby(profile[25] if profile else None, within_km))
 
-    # Fetch all requests where the session username is either Sender or Receiver
-    cursor.execute("SELECT * FROM Requests WHERE sender = ? OR receiver = ?", (username, username))
-    requests = cursor.fetchall()
+    # Request state for every user the session username sent to / received from
+    states = _request_states(cursor, username)
+    recommended = _recommended(cursor, username)
     conn.close()
 
     if profile:
@@ -527,125 +896,91 @@ def groom_profile(username):
             "dislikes": profile[23],
         }
 
-        # Map bride profiles to a list of dictionaries
-        bride_profiles = []
+        # Cards are rendered once per (bride, profile version, request state);
+        # the viewer only appears in the markup once a request is approved
+        bride_cards, recommended_cards = [], []
         for bride in brides:
-            bride_data = {
-                "full_name": bride[1],
-                "country": bride[4],
-                "state": bride[5],
-                "city": bride[6],
-                "diet": bride[8],
-                "complexion": bride[9],
-                "height": bride[10],
-                "weight": bride[11],
-                "manglik": bride[16],
-                "date_of_birth": bride[17],
-                "age": bride[18],
-                "profession": bride[19],
-                "package": bride[20],
-                "education": bride[21],
-                "likes": bride[22],
-                "dislikes": bride[23],
-                "image": bride[12].split(",")[0].replace("\\", "/"),  # Normalize
-                "images": [url_for('uploaded_file', filename=img.replace("\\", "/")) for img in bride[12].split(",") if img],
-                "username": bride[14],
-                "video": bride[13].replace("\\", "/") if bride[13] else None,  # Normalize video path if exists
-                "Sender_status": None,
-                "Send_Or_Receive": None,
-            }
-
-            # Check requests for the current bride
-            for request in requests:
-                if request[1] == username and request[2] == bride[14]:  # Session username is Sender
-                    bride_data["Sender_status"] = request[3]
-                    bride_data["Send_Or_Receive"] = "Sender"
-                elif request[2] == username and request[1] == bride[14]:  # Session username is Receiver
-                    bride_data["Sender_status"] = request[3]
-                    bride_data["Send_Or_Receive"] = "Receiver"
-
-            bride_profiles.append(bride_data)
-
-        # Store groom profile data in the session
-        session['groom_profile'] = profile_data
-
-        return render_template("groom-profile.html", profile=profile_data, brides=bride_profiles)
+            send_or_receive, status = states.get(bride[14], (None, None))
+            key = ("bride", bride[14], bride[0], bride[24], send_or_receive, status,
+                   username if status == "Approved" else None)
+            html = card_cache.get(key)
+            if html is None:
+                bride_data = {
+                    "full_name": bride[1],
+                    "country": bride[4],
+                    "state": bride[5],
+                    "city": bride[6],
+                    "diet": bride[8],
+                    "complexion": bride[9],
+                    "height": bride[10],
+                    "weight": bride[11],
+                    "manglik": bride[16],
+                    "date_of_birth": bride[17],
+                    "age": bride[18],
+                    "profession": bride[19],
+                    "package": bride[20],
+                    "education": bride[21],
+                    "likes": bride[22],
+                    "dislikes": bride[23],
+                    "image": bride[12].split(",")[0].replace("\\", "/"),  # Normalize
+                    "images": [url_for('uploaded_file', filename=img.replace("\\", "/")) for img in bride[12].split(",") if img],
+                    "username": bride[14],
+                    "video": bride[13].replace("\\", "/") if bride[13] else None,  # Normalize video path if exists
+                    "Sender_status": status,
+                    "Send_Or_Receive": send_or_receive,
+                }
+                html = Markup(render_template("partials/bride-card.html", bride=bride_data, profile=profile_data))
+                card_cache.set(key, html)
+            if bride[14] in recommended:
+                recommended_cards.append((recommended[bride[14]], html))
+            else:
+                bride_cards.append(html)
+        recommended_cards = [html for _, html in sorted(recommended_cards, key=lambda item: item[0])]
+
+        return render_template("groom-profile.html", profile=profile_data, bride_cards=bride_cards,
+                               recommended_cards=recommended_cards, within_km=within_km)
     else:
         flash("Profile not found!")
         return redirect(url_for("home"))
 
 # -------------------- Complete Profiles --------------------
-@app.route("/groom-complete-profile/<username>/<viewer>")
-def groom_complete_profile(username, viewer):
-    print("here is the username:", username)
-    print("here is the viewer:", viewer)
+# The page carries the core fields and the first photo only; the gallery is
+# fetched from /api/v1/profile/<username>/media after first paint, and the
+# dashboards prefetch the media for cards scrolled into view (not the page,
+# which is a charged view).
+CORE_FIELDS = (
+    "full_name", "email_id", "phone_number", "country", "state", "city", "address", "diet", "complexion",
+    "height", "weight", "username", "manglik", "date_of_birth", "age", "profession", "package", "education",
+    "likes", "dislikes",
+)
 
-    conn = sqlite3.connect("jeevansathi.db")
+def _complete_profile(table, username, viewer_table, viewer):
+    # One connection; the viewer only supplies a name for the chat header
+    conn = get_db()
     cursor = conn.cursor()
-
-    # Fetch the viewer's profile
-    cursor.execute("SELECT * FROM Bride_profile WHERE username = ?", (viewer,))
-    profile = cursor.fetchone()
-    print("here is the profile:", profile)
-    if profile:
-        # Map viewer profile details to a dictionary
-        profile_data = {
-            "full_name": profile[1],
-            "email_id": profile[2],
-            "phone_number": profile[3],
-            "country": profile[4],
-            "state": profile[5],
-            "city": profile[6],
-            "address": profile[7],
-            "diet": profile[8],
-            "complexion": profile[9],
-            "height": profile[10],
-            "weight": profile[11],
-            "image": profile[12].split(",")[0].replace("\\", "/"),  # Normalize path to use forward slashes
-            "username": profile[14],
-            "manglik": profile[16],
-            "date_of_birth": profile[17],
-            "age": profile[18],
-            "profession": profile[19],
-            "package": profile[20],
-            "education": profile[21],
-            "likes": profile[22],
-            "dislikes": profile[23],
-        }
-
-    # Fetch the groom's profile
-    cursor.execute("SELECT * FROM Groom_profile WHERE username = ?", (username,))
-    groom = cursor.fetchone()
+    cursor.execute(f"SELECT {', '.join(CORE_FIELDS)}, image FROM {table} WHERE username = ?", (username,))
+    row = cursor.fetchone()
+    cursor.execute(f"SELECT username, full_name FROM {viewer_table} WHERE username = ?", (viewer,))
+    viewer_row = cursor.fetchone()
     conn.close()
 
-    if groom:
-        # Map groom profile details to a dictionary
-        groom_profile = {
-            "full_name": groom[1],
-            "email_id": groom[2],
-            "phone_number": groom[3],
-            "country": groom[4],
-            "state": groom[5],
-            "city": groom[6],
-            "address": groom[7],
-            "diet": groom[8],
-            "complexion": groom[9],
-            "height": groom[10],
-            "weight": groom[11],
-            "images": [url_for('uploaded_file', filename=img.replace("\\", "/")) for img in groom[12].split(",") if img],
-            "video": groom[13].replace("\\", "/") if groom[13] else None,
-            "username": groom[14],
-            "manglik": groom[16],
-            "date_of_birth": groom[17],
-            "age": groom[18],
-            "profession": groom[19],
-            "package": groom[20],
-            "education": groom[21],
-            "likes": groom[22],
-            "dislikes": groom[23],
-        }
+    if not row:
+        return None, None, None
+    images = _images_list(row["image"])
+    profile = {f: row[f] for f in CORE_FIELDS}
+    viewer_data = dict(viewer_row) if viewer_row else {"username": viewer, "full_name": viewer}
+    return profile, images[0] if images else None, viewer_data
 
-        return render_template("groom-complete-profile.html", profile=groom_profile, bride=profile_data)
+@app.route("/groom-complete-profile/<username>/<viewer>")
+def groom_complete_profile(username, viewer):
+    if _is_prefetch():
+        # Speculative loads are neither served nor charged as a view
+        return "", 204, {"Cache-Control": "no-store"}
+    if not _charge("view"):
+        return _quota_exceeded("You have reached today's profile view limit for your plan.")
+    groom, hero_image, bride = _complete_profile("Groom_profile", username, "Bride_profile", viewer)
+    if groom:
+        return render_template("groom-complete-profile.html", profile=groom, hero_image=hero_image, bride=bride)
     else:
         flash("Groom profile not found!")
         return redirect(url_for("home"))
@@ -653,77 +988,195 @@ def groom_complete_profile(username, viewer):
 
 @app.route('/bride_complete_profile/<username>/<viewer>')
 def bride_complete_profile(username, viewer):
-    conn = sqlite3.connect("jeevansathi.db")
+    if _is_prefetch():
+        return "", 204, {"Cache-Control": "no-store"}
+    if not _charge("view"):
+        return _quota_exceeded("You have reached today's profile view limit for your plan.")
+    bride, hero_image, groom = _complete_profile("Bride_profile", username, "Groom_profile", viewer)
+    if bride:
+        return render_template("bride-complete-profile.html", profile=bride, hero_image=hero_image, groom=groom)
+    else:
+        flash("Bride profile not found!")
+        return redirect(url_for("home"))
+
+# -------------------- JSON API (v1) --------------------
+CANDIDATE_FIELDS = (
+    "username", "full_name", "country", "state", "city", "diet", "complexion", "height", "weight",
+    "manglik", "date_of_birth", "age", "profession", "package", "education", "likes", "dislikes",
+    "image", "images", "video", "version", "Send_Or_Receive", "Sender_status", "distance_km",
+)
+CONTACT_FIELDS = ("email_id", "phone_number", "address")
+
+def _find_profile(cursor, username):
+    for kind, table in (("bride", "Bride_profile"), ("groom", "Groom_profile")):
+        cursor.execute(f"SELECT * FROM {table} WHERE username = ?", (username,))
+        row = cursor.fetchone()
+        if row:
+            return kind, row
+    return None, None
+
+def _api_profile(row, state=(None, None)):
+    images = _images_list(row["image"])
+    data = {f: row[f] for f in (
+        "username", "full_name", "country", "state", "city", "diet", "complexion", "height", "weight",
+        "manglik", "date_of_birth", "age", "profession", "package", "education", "likes", "dislikes",
+        "version", "email_id", "phone_number", "address",
+    )}
+    data["image"] = images[0] if images else None
+    data["images"] = images
+    data["video"] = url_for("uploaded_file", filename=row["video"].replace("\\", "/")) if row["video"] else None
+    data["Send_Or_Receive"], data["Sender_status"] = state
+    return data
+
+@app.route("/api/v1/candidates")
+def api_candidates():
+    username = request.args.get("username")
+    if not username:
+        return json_api.respond({"error": "username is required"}, 400)
+    if not quota.check("dashboard", username, request.remote_addr):
+        return json_api.respond({"error": "Too many candidate requests today"}, 429)
+
+    fields = json_api.parse_fields(CANDIDATE_FIELDS)
+    limit = max(1, min(request.args.get("limit", 50, type=int), 500))   # LIMIT -1 would mean "all"
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    # ?usernames=a,b refetches just the cards a Socket.IO update touched
+    only = [u for u in (request.args.get("usernames") or "").split(",") if u]
+
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM groom_profile WHERE username = ?", (viewer,))
-    profile = cursor.fetchone()
+    kind, viewer = _find_profile(cursor, username)
+    if not viewer:
+        conn.close()
+        return json_api.respond({"error": "Profile not found"}, 404)
+
+    table = "Groom_profile" if kind == "bride" else "Bride_profile"
+    where, params = [], []
+    if only:
+        where.append(f"username IN ({','.join('?' * len(only))})")
+        params.extend(only)
+    near = _nearby(viewer["location_id"], request.args.get("within_km", type=float))
+    if near is not None:
+        where.append(f"location_id IN ({','.join('?' * len(near))})")
+        params.extend(near)
+    sql = f"SELECT * FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    cursor.execute(sql + " ORDER BY id LIMIT ? OFFSET ?", (*params, limit, offset))
+    rows = cursor.fetchall()
+    states = _request_states(cursor, username)
+    conn.close()
 
-    if profile:
-        # Map bride profile details to a dictionary
-        profile_data = {
-            "full_name": profile[1],
-            "email_id": profile[2],
-            "phone_number": profile[3],
-            "country": profile[4],
-            "state": profile[5],
-            "city": profile[6],
-            "address": profile[7],
-            "diet": profile[8],
-            "complexion": profile[9],
-            "height": profile[10],
-            "weight": profile[11],
-            "image": profile[12].split(",")[0].replace("\\", "/"),  # Normalize path to use forward slashes
-            "username": profile[14],
-            "manglik": profile[16],
-            "date_of_birth": profile[17],
-            "age": profile[18],
-            "profession": profile[19],
-            "package": profile[20],
-            "education": profile[21],
-            "likes": profile[22],
-            "dislikes": profile[23],
-        }
+    candidates = []
+    for row in rows:
+        data = _api_profile(row, states.get(row["username"], (None, None)))
+        data["distance_km"] = geo.distance_km(viewer["location_id"], row["location_id"])
+        candidates.append(json_api.project(data, fields))
+    return json_api.respond({"viewer": username, "offset": offset, "count": len(candidates), "candidates": candidates})
+
+@app.route("/api/v1/profile/<username>")
+def api_profile(username):
+    # The viewer is whoever logged in on this session, never a query parameter
+    viewer = session_user()
+    conn = get_db()
+    cursor = conn.cursor()
+    kind, row = _find_profile(cursor, username)
+    if not row:
+        conn.close()
+        return json_api.respond({"error": "Profile not found"}, 404)
+    state = _request_states(cursor, viewer).get(username, (None, None)) if viewer else (None, None)
+    conn.close()
+
+    # Same data as a complete-profile page, so it costs a view (own profile excepted)
+    if viewer != username and not _charge("view"):
+        return json_api.respond({"error": "You have reached today's profile view limit for your plan."}, 429)
+
+    # Contact details only for the owner or an approved match
+    allowed = CANDIDATE_FIELDS + (CONTACT_FIELDS if viewer == username or state[1] == "Approved" else ())
+    fields = json_api.parse_fields(allowed)
+    return json_api.respond({"kind": kind, "profile": json_api.project(_api_profile(row, state), fields)})
 
-    # Use 'username' and 'viewer' as needed
-    conn = sqlite3.connect("jeevansathi.db")
+@app.route("/api/v1/profile/<username>/media")
+def api_profile_media(username):
+    # Gallery segment of the complete-profile page, loaded lazily / prefetched
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM Bride_profile WHERE username = ?", (username,))
-    bride = cursor.fetchone()
+    row = None
+    for table in ("Bride_profile", "Groom_profile"):
+        cursor.execute(f"SELECT username, image, video FROM {table} WHERE username = ?", (username,))
+        row = cursor.fetchone()
+        if row:
+            break
     conn.close()
+    if not row:
+        return json_api.respond({"error": "Profile not found"}, 404)
 
-    if bride:
-        # Map bride profile details to a dictionary
-        bride_profile = {
-            "full_name": bride[1],
-            "email_id": bride[2],
-            "phone_number": bride[3],
-            "country": bride[4],
-            "state": bride[5],
-            "city": bride[6],
-            "address": bride[7],
-            "diet": bride[8],
-            "complexion": bride[9],
-            "height": bride[10],
-            "weight": bride[11],
-            "images": [url_for('uploaded_file', filename=img.replace("\\", "/")) for img in bride[12].split(",") if img],
-            "video": bride[13].replace("\\", "/") if bride[13] else None,
-            "username": bride[14],
-            "manglik": bride[16],
-            "date_of_birth": bride[17],
-            "age": bride[18],
-            "profession": bride[19],
-            "package": bride[20],
-            "education": bride[21],
-            "likes": bride[22],
-            "dislikes": bride[23],
-        }
+    video = url_for("uploaded_file", filename=row["video"].replace("\\", "/")) if row["video"] else None
+    return json_api.respond({"username": username, "images": _images_list(row["image"]), "video": video})
 
-        return render_template("bride-complete-profile.html", profile=bride_profile, groom=profile_data)
-    else:
-        flash("Bride profile not found!")
-        return redirect(url_for("home"))
+# -------------------- Bulk Import / Export (admin) --------------------
+# Disabled unless ADMIN_TOKEN is set; callers send it as X-Admin-Token.
+# Media files are only handled by the CLI (python profile_io.py import --media-dir ...).
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+MAX_REJECTS_SHOWN = 100
+
+def _admin_allowed():
+    token = request.headers.get("X-Admin-Token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+def _run_import(kind, stream, fmt, rejects):
+    # Own connection: this may run on an offload thread
+    conn = connect_db()
+    try:
+        return profile_io.import_profiles(conn, kind, stream, fmt, upload_dir=app.config["UPLOAD_FOLDER"], rejects=rejects)
+    finally:
+        conn.close()
+
+@app.route("/admin/profiles/<kind>/import", methods=["POST"])
+def admin_import_profiles(kind):
+    if not _admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if kind not in profile_io.TABLES:
+        return jsonify({"error": "kind must be bride or groom"}), 404
+    upload = request.files.get("file")
+    if not upload:
+        return jsonify({"error": "file is required"}), 400
+
+    fmt = request.form.get("format") or ("csv" if (upload.filename or "").lower().endswith(".csv") else "jsonl")
+    if fmt not in profile_io.FORMATS:
+        return jsonify({"error": "format must be csv or jsonl"}), 400
+
+    stream = io.TextIOWrapper(upload.stream, encoding="utf-8", newline="")
+    rejects = io.StringIO()
+    stats = offload.run_blocking(_run_import, kind, stream, fmt, rejects)
+    stats["rejects"] = [json.loads(line) for line in rejects.getvalue().splitlines()[:MAX_REJECTS_SHOWN]]
+    return jsonify(stats)
+
+@app.route("/admin/profiles/<kind>/export")
+def admin_export_profiles(kind):
+    if not _admin_allowed():
+        return jsonify({"error": "Forbidden"}), 403
+    if kind not in profile_io.TABLES:
+        return jsonify({"error": "kind must be bride or groom"}), 404
+    fmt = request.args.get("format", "jsonl")
+    if fmt not in profile_io.FORMATS:
+        return jsonify({"error": "format must be csv or jsonl"}), 400
+
+    def generate():
+        conn = connect_db()
+        try:
+            yield from profile_io.export_profiles(conn, kind, fmt)
+        finally:
+            conn.close()
+
+    resp = Response(stream_with_context(generate()), mimetype="text/csv" if fmt == "csv" else "application/x-ndjson")
+    resp.headers["Content-Disposition"] = f"attachment; filename={kind}_profiles.{fmt}"
+    return resp
 
 # -------------------- Requests (Send/Approve/Cancel/Delete) --------------------
+def emit_event(event, payload):
+    metrics.SOCKETIO_EMITS.inc(event=event)
+    socketio.emit(event, payload, to=None)
+
 @app.route('/send_request', methods=['POST'])
 def send_request():
     data = request.get_json()
@@ -733,8 +1186,11 @@ def send_request():
     if not sender or not receiver:
         return jsonify({'error': 'Invalid data'}), 400
 
+    if not _charge("interest"):
+        return jsonify({'error': "You have reached today's interest limit for your plan."}), 429
+
     # Connect to the SQLite database
-    conn = sqlite3.connect('jeevansathi.db')
+    conn = connect_db()
     cursor = conn.cursor()
 
     # Insert the request into the Requests table
@@ -748,7 +1204,9 @@ def send_request():
     conn.close()
 
     # Emit real-time event to notify clients of the update
-    socketio.emit('update_request', {'sender': sender, 'receiver': receiver}, to=None)
+    card_cache.invalidate_user(sender)
+    card_cache.invalidate_user(receiver)
+    emit_event('update_request', {'sender': sender, 'receiver': receiver})
 
     return jsonify({'message': 'Request sent successfully'}), 200
 
@@ -759,7 +1217,7 @@ def approve_request():
     sender = data.get('sender')
     receiver = data.get('receiver')
 
-    conn = sqlite3.connect('jeevansathi.db')
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute('''
         UPDATE Requests
@@ -770,7 +1228,9 @@ def approve_request():
     conn.close()
 
     # Emit real-time event to notify clients of the update
-    socketio.emit('update_request', {'sender': sender, 'receiver': receiver}, to=None)
+    card_cache.invalidate_user(sender)
+    card_cache.invalidate_user(receiver)
+    emit_event('update_request', {'sender': sender, 'receiver': receiver})
 
     return jsonify({'message': 'Request approved successfully'}), 200
 
@@ -780,7 +1240,7 @@ def cancel_request():
     sender = data.get('sender')
     receiver = data.get('receiver')
 
-    conn = sqlite3.connect('jeevansathi.db')
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute('''
         DELETE FROM Requests
@@ -790,7 +1250,9 @@ def cancel_request():
     conn.close()
 
     # Emit real-time event to notify clients of the update
-    socketio.emit('update_request', {'sender': sender, 'receiver': receiver}, to=None)
+    card_cache.invalidate_user(sender)
+    card_cache.invalidate_user(receiver)
+    emit_event('update_request', {'sender': sender, 'receiver': receiver})
 
     return jsonify({'message': 'Request canceled successfully'}), 200
 
@@ -800,7 +1262,7 @@ def delete_request():
     sender = data.get('sender')
     receiver = data.get('receiver')
 
-    conn = sqlite3.connect('jeevansathi.db')
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute('''
         DELETE FROM Requests
@@ -810,7 +1272,9 @@ def delete_request():
     conn.close()
 
     # Emit real-time event to notify clients of the update
-    socketio.emit('update_request', {'sender': sender, 'receiver': receiver}, to=None)
+    card_cache.invalidate_user(sender)
+    card_cache.invalidate_user(receiver)
+    emit_event('update_request', {'sender': sender, 'receiver': receiver})
 
     return jsonify({'message': 'Request deleted successfully'}), 200
 
@@ -824,37 +1288,12 @@ def save_message():
 
     if not sender or not receiver or not message or not room_id:
         return jsonify({'error': 'Invalid data'}), 400
+    # Only text goes into the write-behind log; anything else would fail its whole batch
+    if not all(isinstance(v, str) for v in (sender, receiver, message, room_id)):
+        return jsonify({'error': 'Invalid data'}), 400
 
-    # Get the current date and time
-    current_date = datetime.now().strftime('%Y-%m-%d')
-    current_time = datetime.now().strftime('%H:%M:%S')
-
-    # Connect to the SQLite database
-    conn = sqlite3.connect('jeevansathi.db')
-    cursor = conn.cursor()
-
-    # Ensure the Messages table exists
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS Messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sender TEXT NOT NULL,
-            receiver TEXT NOT NULL,
-            message TEXT NOT NULL,
-            room_id TEXT NOT NULL,
-            date TEXT NOT NULL,
-            time TEXT NOT NULL
-        )
-    ''')
-
-    # Insert the message into the Messages table
-    cursor.execute('''
-        INSERT INTO Messages (sender, receiver, message, room_id, date, time)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (sender, receiver, message, room_id, current_date, current_time))
-
-    # Commit the transaction and close the connection
-    conn.commit()
-    conn.close()
+    # Logged now, written to the hot table and inbox summary with the next batch
+    message_writer.submit(room_id, [room_id, sender, receiver, message, int(time.time())])
 
     return jsonify({'message': 'Message saved successfully'}), 200
 
@@ -867,19 +1306,25 @@ def get_messages():
     if not room_id or not sender or not receiver:
         return jsonify({'error': 'Room ID, sender, and receiver are required'}), 400
 
+    # Messages still buffered for this room go in first
+    if message_writer.has_pending(room_id):
+        message_writer.flush()
+
     # Connect to the SQLite database
-    conn = sqlite3.connect('jeevansathi.db')
+    conn = connect_db()
     cursor = conn.cursor()
 
-    # Fetch messages where sender and receiver match the given criteria
-    cursor.execute('''
-        SELECT sender, receiver, message, room_id, date, time
-        FROM Messages
-        WHERE room_id = ?
-        AND ((sender = ? AND receiver = ?) OR (sender = ? AND receiver = ?))
-        ORDER BY date ASC, time ASC
-    ''', (room_id, sender, receiver, receiver, sender))
-    messages = cursor.fetchall()
+    # Fetch messages between sender and receiver (archived segments + hot table)
+    messages = message_store.fetch_messages(cursor, room_id, sender, receiver)
+
+    # The logged-in reader has now seen everything in this room (not whoever ?sender= names)
+    reader = session_user()
+    if reader:
+        cursor.execute('''
+            UPDATE Conversations SET unread_count = 0
+            WHERE room_id = ? AND username = ? AND unread_count != 0
+        ''', (room_id, reader))
+        conn.commit()
     conn.close()
 
     # Map messages to a list of dictionaries
@@ -897,6 +1342,42 @@ def get_messages():
 
     return jsonify(messages_data), 200
 
+@app.route('/conversations', methods=['GET'])
+def conversations():
+    # Only the logged-in user's own inbox; a ?username= parameter is ignored
+    username = session_user()
+
+    if not username:
+        return jsonify({'error': 'Login required'}), 401
+
+    conn = connect_db()
+    cursor = conn.cursor()
+
+    # One row per room, newest first - no scan of Messages
+    cursor.execute('''
+        SELECT room_id, peer, last_sender, last_message, last_date, last_time, unread_count
+        FROM Conversations
+        WHERE username = ?
+        ORDER BY last_date DESC, last_time DESC
+    ''', (username,))
+    rows = cursor.fetchall()
+    conn.close()
+
+    conversations_data = [
+        {
+            'room_id': row[0],
+            'peer': row[1],
+            'last_sender': row[2],
+            'last_message': row[3],
+            'date': row[4],
+            'time': row[5],
+            'unread_count': row[6],
+        }
+        for row in rows
+    ]
+
+    return jsonify(conversations_data), 200
+
 @app.route('/logout')
 def logout():
     session.clear()  # Clear the session to log out the user
@@ -906,13 +1387,48 @@ def logout():
 # -------------------- Chatbot (FAQs + Query) --------------------
 # Load FAQs (safe fallback)
 def get_db_connection():
-    conn = sqlite3.connect('jeevansathi.db')
+    conn = connect_db()
     conn.row_factory = sqlite3.Row
     return conn
 
-# Load FAQs
-with open('faqs.json', 'r') as f:
-    faqs = json.load(f)
+# FAQ index (question -> answer), built on the first /chat call
+FAQS_PATH = os.path.join(app.root_path, "faqs.json")
+_faq_index = None
+
+def faq_index():
+    global _faq_index
+    if _faq_index is None:
+        with open(FAQS_PATH, 'r') as f:
+            index = {}
+            for item in json.load(f):
+                question = (item.get("question") or "").strip().lower()
+                index.setdefault(question, item.get("answer", "Sorry, no answer found."))
+        _faq_index = index
+    return _faq_index
+
+def _search_by_location(cursor, table, place, age_min, age_max, within_km=None):
+    # Known places match on location id (aliases like "bengaluru" or "gurugram"
+    # included); anything not in the gazetteer falls back to the city text
+    location_id = geo.resolve(place)
+    if location_id is None:
+        city = " ".join([w.capitalize() for w in place.split()])
+        cursor.execute(f"""
+            SELECT full_name, age, city, profession, education, NULL AS distance_km
+            FROM {table}
+            WHERE city=? AND age BETWEEN ? AND ?
+        """, (city, age_min, age_max))
+        return cursor.fetchall()
+
+    near = geo.within(location_id, geo.clamp_radius(within_km) or 0)
+    marks = ",".join("?" * len(near))
+    cursor.execute(f"""
+        SELECT full_name, age, city, profession, education, location_id
+        FROM {table}
+        WHERE location_id IN ({marks}) AND age BETWEEN ? AND ?
+    """, (*near, age_min, age_max))
+    results = [dict(row, distance_km=near[row["location_id"]]) for row in cursor.fetchall()]
+    results.sort(key=lambda p: p["distance_km"])
+    return results
 
 @app.route("/chat", methods=["POST"])
 def chat():
@@ -921,71 +1437,41 @@ def chat():
         return jsonify({"reply": "Please enter a message."})
 
     # 1️⃣ Check FAQs first
-    for item in faqs:
-        if user_msg == (item.get("question") or "").strip().lower():
-            return jsonify({"reply": item.get("answer", "Sorry, no answer found.")})
+    answer = faq_index().get(user_msg)
+    if answer is not None:
+        return jsonify({"reply": answer})
 
     conn = get_db_connection()
     conn.row_factory = sqlite3.Row  # ✅ Important for dict-style access
     cursor = conn.cursor()
 
-    # 2️⃣ Bride/Groom query patterns
+    # 2️⃣ Bride/Groom query patterns; "within 50 km of pune" reads as "from pune" plus a radius
+    radius = re.search(r'within (\d+)\s*(?:km|kms|kilometers?)(\s+of)?', user_msg)
+    within_km = int(radius.group(1)) if radius else None
+    if radius:
+        user_msg = user_msg[:radius.start()] + (" from " if radius.group(2) else " ") + user_msg[radius.end():]
+
     bride_pattern = re.search(r'brides?.*from ([\w\s]+).*age (\d+)(?: to (\d+))?', user_msg)
     groom_pattern = re.search(r'grooms?.*from ([\w\s]+).*age (\d+)(?: to (\d+))?', user_msg)
 
-    if bride_pattern:
-        city = " ".join([w.capitalize() for w in bride_pattern.group(1).split()])
-        age_min = int(bride_pattern.group(2))
-        age_max = int(bride_pattern.group(3)) if bride_pattern.group(3) else age_min
-
-        if age_min == age_max:
-            cursor.execute("""
-                SELECT full_name, age, city, profession, education
-                FROM Bride_profile
-                WHERE city=? AND age=?
-            """, (city, age_min))
-        else:
-            cursor.execute("""
-                SELECT full_name, age, city, profession, education
-                FROM Bride_profile
-                WHERE city=? AND age BETWEEN ? AND ?
-            """, (city, age_min, age_max))
-
-        results = cursor.fetchall()
+    for pattern, table, label in ((bride_pattern, "Bride_profile", "brides"), (groom_pattern, "Groom_profile", "grooms")):
+        if not pattern:
+            continue
+        age_min = int(pattern.group(2))
+        age_max = int(pattern.group(3)) if pattern.group(3) else age_min
+        results = _search_by_location(cursor, table, pattern.group(1), age_min, age_max, within_km)
         conn.close()  # ✅ Close connection
 
         if results:
-            reply = "\n".join([f"{b['full_name']}, Age: {b['age']}, City: {b['city']}, Profession: {b['profession']}, Education: {b['education']}" for b in results])
-            return jsonify({"reply": reply})
-        else:
-            return jsonify({"reply": "No brides found matching your criteria."})
-
-    elif groom_pattern:
-        city = " ".join([w.capitalize() for w in groom_pattern.group(1).split()])
-        age_min = int(groom_pattern.group(2))
-        age_max = int(groom_pattern.group(3)) if groom_pattern.group(3) else age_min
-
-        if age_min == age_max:
-            cursor.execute("""
-                SELECT full_name, age, city, profession, education
-                FROM Groom_profile
-                WHERE city=? AND age=?
-            """, (city, age_min))
-        else:
-            cursor.execute("""
-                SELECT full_name, age, city, profession, education
-                FROM Groom_profile
-                WHERE city=? AND age BETWEEN ? AND ?
-            """, (city, age_min, age_max))
-
-        results = cursor.fetchall()
-        conn.close()
-
-        if results:
-            reply = "\n".join([f"{g['full_name']}, Age: {g['age']}, City: {g['city']}, Profession: {g['profession']}, Education: {g['education']}" for g in results])
+            reply = "\n".join([
+                f"{p['full_name']}, Age: {p['age']}, City: {p['city']}"
+                + (f" ({p['distance_km']:g} km away)" if p['distance_km'] else "")
+                + f", Profession: {p['profession']}, Education: {p['education']}"
+                for p in results
+            ])
             return jsonify({"reply": reply})
         else:
-            return jsonify({"reply": "No grooms found matching your criteria."})
+            return jsonify({"reply": f"No {label} found matching your criteria."})
 
     # 3️⃣ Default fallback
     conn.close()
@@ -1001,6 +1487,7 @@ def kundli_home():
 
 @app.route("/kundli/match", methods=["POST"])
 def kundli_match():
+    groq_client = get_groq_client()
     if not groq_client:
         return jsonify({"error": "GROQ_API_KEY not configured"}), 500
 
@@ -1036,13 +1523,21 @@ Output format:
 """
 
     try:
-        resp = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": "You are a Kundli matching expert."},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        # Network call runs off the worker's event loop
+        t = time.perf_counter()
+        outcome = "error"
+        try:
+            resp = offload.run_blocking(
+                groq_client.chat.completions.create,
+                model="llama-3.1-8b-instant",
+                messages=[
+                    {"role": "system", "content": "You are a Kundli matching expert."},
+                    {"role": "user", "content": prompt}
+                ]
+            )
+            outcome = "ok"
+        finally:
+            metrics.LLM_LATENCY.observe(time.perf_counter() - t, model="llama-3.1-8b-instant", outcome=outcome)
         result = resp.choices[0].message.content
         m = re.search(r"(\d{1,2})\s*/\s*36", result or "")
         score = m.group(1) if m else "N/A"
@@ -1051,6 +1546,19 @@ Output format:
         return jsonify({"error": str(e)}), 500
 
 # -------------------- Run App --------------------
+def start_background_jobs():
+    socketio.start_background_task(message_store.run_archiver, get_db, sleep=socketio.sleep)
+    socketio.start_background_task(ages.run_age_job, get_db, sleep=socketio.sleep)
+    socketio.start_background_task(chat_writer.run_flusher, message_writer, sleep=socketio.sleep)
+    socketio.start_background_task(quota.run_quota_flusher, connect_db, sleep=socketio.sleep)
+
 if __name__ == "__main__":
-    socketio.run(app, host="127.0.0.1", port=5000, debug=True)
+    if sys.argv[1:] == ["migrate"]:
+        init_db()
+        print(f"schema at version {SCHEMA_VERSION}")
+    else:
+        # The dev server keeps migrating on start
+        create_app(auto_migrate=True)
+        start_background_jobs()
+        socketio.run(app, host="127.0.0.1", port=5000, debug=True)
 
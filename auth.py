@@ -0,0 +1,119 @@
+# auth.py  (password hashing + login throttling)
+
+import os
+import hmac
+import time
+import base64
+import hashlib
+import threading
+
+import offload
+
+# scrypt cost: memory = 128 * N * r bytes (defaults ~16 MB, ~50 ms per hash)
+SCRYPT_N = int(os.getenv("SCRYPT_N", "16384"))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+KDF_WORKERS = int(os.getenv("KDF_WORKERS", "4"))
+
+LOGIN_RATE_BURST = int(os.getenv("LOGIN_RATE_BURST", "5"))
+LOGIN_RATE_PER_MIN = float(os.getenv("LOGIN_RATE_PER_MIN", "10"))
+
+PREFIX = "scrypt"
+
+# Bounded pool: at most KDF_WORKERS hashes (and their memory) in flight.
+# hashlib.scrypt releases the GIL, so request/socket threads keep running.
+_kdf_pool = offload.BoundedOffload(KDF_WORKERS, "kdf")
+
+# -------------------- Hashing --------------------
+def _b64(raw):
+    return base64.b64encode(raw).decode("ascii")
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r * p + 1024 * 1024, dklen=32
+    )
+
+def hash_password(password, n=None, r=None, p=None):
+    n, r, p = n or SCRYPT_N, r or SCRYPT_R, p or SCRYPT_P
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"{PREFIX}${n}${r}${p}${_b64(salt)}${_b64(digest)}"
+
+def is_hashed(stored):
+    return bool(stored) and stored.startswith(PREFIX + "$")
+
+def verify_password(password, stored):
+    # Returns (ok, needs_rehash). Plaintext rows from before hashing still
+    # verify once, and are flagged so the caller upgrades them in place.
+    if not stored:
+        return False, False
+
+    if not is_hashed(stored):
+        ok = hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+        return ok, ok
+
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        salt, digest = base64.b64decode(salt), base64.b64decode(digest)
+    except ValueError:
+        return False, False
+
+    ok = hmac.compare_digest(_scrypt(password, salt, n, r, p), digest)
+    needs_rehash = ok and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return ok, needs_rehash
+
+def hash_password_async(password):
+    return _kdf_pool.run(hash_password, password)
+
+def verify_password_async(password, stored):
+    return _kdf_pool.run(verify_password, password, stored)
+
+# Stands in for the stored hash of an unknown username, so a miss costs the
+# same KDF as a wrong password (no username-probing timing oracle). Random
+# salt and digest: it has the current cost parameters and never matches.
+_DUMMY_HASH = f"{PREFIX}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(os.urandom(16))}${_b64(os.urandom(32))}"
+
+def verify_unknown_user_async(password):
+    _kdf_pool.run(verify_password, password, _DUMMY_HASH)
+    return False, False
+
+# -------------------- Rate Limiting --------------------
+class TokenBucketLimiter:
+    def __init__(self, burst=LOGIN_RATE_BURST, per_minute=LOGIN_RATE_PER_MIN, max_keys=100000):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+            return allowed
+
+    def _prune(self, now):
+        # Buckets that have refilled completely carry no state worth keeping
+        full = [
+            k for k, (tokens, last) in self._buckets.items()
+            if tokens + (now - last) * self.rate >= self.burst
+        ]
+        for k in full:
+            del self._buckets[k]
+
+login_limiter = TokenBucketLimiter()
+
+def login_allowed(username, ip):
+    # Both buckets are charged so one can't be used to drain the other's check
+    user_ok = login_limiter.allow(f"user:{username}")
+    ip_ok = login_limiter.allow(f"ip:{ip}")
+    return user_ok and ip_ok
@@ -0,0 +1,113 @@
+# bench_chat_writes.py  (sustained /save_message throughput, write-through vs write-behind)
+#
+#   python benchmarks/bench_chat_writes.py --rooms 200 --threads 16 --duration 10
+#
+# Each thread posts to its own share of the rooms through the Flask test
+# client for --duration seconds, first with CHAT_FLUSH_INTERVAL=0 (a commit
+# per message, as before the write-behind buffer) and then with the given
+# interval/size. After each run the writer is closed and the hot table is
+# counted, so every reported message is also a durable one.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def _run(app, chat_writer, args, flush_interval):
+    writer = app.message_writer = chat_writer.ChatWriter(
+        app.connect_db, app._write_messages, log_dir=os.path.join(args.workdir, f"log-{flush_interval}"),
+        flush_interval=flush_interval, flush_size=args.flush_size)
+    writer.recover()
+    flusher = threading.Thread(target=chat_writer.run_flusher, args=(writer,), daemon=True)
+    flusher.start()
+
+    conn = app.connect_db()
+    before = conn.execute("SELECT COUNT(*) FROM Chat_messages").fetchone()[0]
+    conn.close()
+
+    sent, latencies, lock = [0], [], threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker(n):
+        client = app.app.test_client()
+        rng = random.Random(n)
+        rooms = [r for r in range(args.rooms) if r % args.threads == n]
+        mine, lat = 0, []
+        while time.perf_counter() < deadline:
+            room = rng.choice(rooms)
+            a, b = f"user{room}a", f"user{room}b"
+            sender, receiver = (a, b) if rng.random() < 0.5 else (b, a)
+            t = time.perf_counter()
+            resp = client.post("/save_message", json={
+                "Sender": sender, "Receiver": receiver, "Message": f"hello {mine}", "Room_ID": f"room{room}"})
+            lat.append(time.perf_counter() - t)
+            if resp.status_code == 200:
+                mine += 1
+        with lock:
+            sent[0] += mine
+            latencies.extend(lat)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    writer.close()
+    flusher.join()
+
+    conn = app.connect_db()
+    stored = conn.execute("SELECT COUNT(*) FROM Chat_messages").fetchone()[0] - before
+    conn.close()
+    latencies.sort()
+    return {
+        "flush_interval_s": flush_interval,
+        "sent": sent[0],
+        "stored": stored,
+        "msgs_per_s": round(sent[0] / elapsed),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--flush-interval", type=float, default=0.2)
+    parser.add_argument("--flush-size", type=int, default=500)
+    args = parser.parse_args()
+
+    args.workdir = tempfile.mkdtemp(prefix="bench_chat_")
+    os.environ["DATABASE_PATH"] = os.path.join(args.workdir, "chat.db")
+    os.environ["CHAT_LOG_DIR"] = os.path.join(args.workdir, "log")
+    os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+    os.environ.setdefault("SLOW_REQUEST_MS", "60000")
+    os.chdir(ROOT)
+
+    import app
+    import chat_writer
+    app.create_app(auto_migrate=True)
+
+    results = [_run(app, chat_writer, args, 0), _run(app, chat_writer, args, args.flush_interval)]
+    print(json.dumps({
+        "rooms": args.rooms,
+        "threads": args.threads,
+        "duration_s": args.duration,
+        "flush_size": args.flush_size,
+        "write_through": results[0],
+        "write_behind": results[1],
+        "speedup": round(results[1]["msgs_per_s"] / max(1, results[0]["msgs_per_s"]), 1),
+        "workdir": args.workdir,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# bench_import.py  (bulk profile import/export throughput)
+#
+#   python benchmarks/bench_import.py --profiles 100000 --batch-size 5000
+#
+# Writes a synthetic JSONL dump (pre-hashed passwords, as a migration from
+# another install would carry), imports it into a fresh database, exports it
+# again as CSV, and reports rows/second for each step.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_import_")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "import.db")
+    os.chdir(ROOT)   # app resolves faqs.json / templates relative to the repo root
+
+    import app
+    import auth
+    import profile_io
+    import generate_data
+
+    app.create_app(auto_migrate=True, recover_chat_log=False)
+
+    rng = random.Random(args.seed)
+    cum_weights = list(itertools.accumulate(w for _, _, w in generate_data.CITIES))
+    locations = {(c, s): None for c, s, _ in generate_data.CITIES}
+    columns = [c.strip() for c in generate_data.PROFILE_COLUMNS.split(",")]
+    dump = os.path.join(workdir, "brides.jsonl")
+
+    t0 = time.perf_counter()
+    with open(dump, "w", encoding="utf-8") as f:
+        rows = generate_data._profile_rows(rng, "bride", args.profiles, auth.hash_password("bench@123"),
+                                           cum_weights, locations)
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, row))) + "\n")
+    write_s = time.perf_counter() - t0
+
+    conn = app.connect_db()
+    t0 = time.perf_counter()
+    with open(dump, encoding="utf-8") as f:
+        stats = profile_io.import_profiles(conn, "bride", f, "jsonl", batch_size=args.batch_size)
+    import_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    exported = 0
+    with open(os.path.join(workdir, "brides.csv"), "w", newline="", encoding="utf-8") as f:
+        for text in profile_io.export_profiles(conn, "bride", "csv"):
+            f.write(text)
+            exported += text.count("\n")
+    export_s = time.perf_counter() - t0
+    conn.close()
+
+    print(json.dumps({
+        "profiles": args.profiles,
+        "batch_size": args.batch_size,
+        "dump_write_s": round(write_s, 2),
+        "import": {**stats, "seconds": round(import_s, 2), "rows_per_s": round(stats["imported"] / import_s)},
+        "export": {"lines": exported, "seconds": round(export_s, 2), "rows_per_s": round(exported / export_s)},
+        "workdir": workdir,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
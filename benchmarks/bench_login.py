@@ -0,0 +1,63 @@
+# bench_login.py  (login throughput at chosen scrypt cost)
+#
+#   python benchmarks/bench_login.py --n 16384 --r 8 --p 1 --workers 4 --logins 200 --threads 16
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=16384)
+    parser.add_argument("--r", type=int, default=8)
+    parser.add_argument("--p", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4, help="KDF pool size")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16, help="concurrent request threads")
+    args = parser.parse_args()
+
+    # auth reads its cost parameters at import time
+    os.environ["SCRYPT_N"] = str(args.n)
+    os.environ["SCRYPT_R"] = str(args.r)
+    os.environ["SCRYPT_P"] = str(args.p)
+    os.environ["KDF_WORKERS"] = str(args.workers)
+    import auth
+
+    stored = auth.hash_password("correct horse battery staple")
+
+    # Single hash latency
+    t0 = time.perf_counter()
+    for _ in range(5):
+        auth.verify_password("correct horse battery staple", stored)
+    single_ms = (time.perf_counter() - t0) / 5 * 1000
+
+    # Throughput through the bounded pool with many concurrent callers
+    def one_login(_):
+        t = time.perf_counter()
+        ok, _ = auth.verify_password_async("correct horse battery staple", stored)
+        assert ok
+        return time.perf_counter() - t
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as callers:
+        latencies = sorted(callers.map(one_login, range(args.logins)))
+    elapsed = time.perf_counter() - t0
+
+    print(json.dumps({
+        "benchmark": "login_kdf",
+        "scrypt": {"n": args.n, "r": args.r, "p": args.p, "mem_mb": round(128 * args.n * args.r / 2**20, 1)},
+        "kdf_workers": args.workers,
+        "caller_threads": args.threads,
+        "single_verify_ms": round(single_ms, 2),
+        "logins_per_sec": round(args.logins / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_quota.py  (cost of the daily quota checks)
+#
+#   python benchmarks/bench_quota.py --users 100000 --checks 1000000
+#
+# Times quota.check() against a store already holding --users users' counters
+# (the hot path), the periodic flush of those counters to SQLite, and one
+# quota-checked request (/api/v1/candidates for an unknown user, which skips
+# the candidate scan) with enforcement on vs off.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--checks", type=int, default=1000000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_quota_")
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "quota.db")
+    os.environ["CHAT_LOG_DIR"] = os.path.join(workdir, "log")
+    os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+    os.chdir(ROOT)
+
+    import app
+    import quota
+    app.create_app(auto_migrate=True, recover_chat_log=False)
+
+    rng = random.Random(args.seed)
+    users = [f"user{i}" for i in range(args.users)]
+    ips = [f"10.0.{i // 256}.{i % 256}" for i in range(args.users // 10 or 1)]
+    plans = list(quota.PLAN_LIMITS)
+    picks = [(rng.choice(users), rng.choice(ips), rng.choice(plans)) for _ in range(args.checks)]
+
+    t0 = time.perf_counter()
+    allowed = sum(quota.check("view", u, ip, plan) for u, ip, plan in picks)
+    check_s = time.perf_counter() - t0
+
+    conn = app.connect_db()
+    t0 = time.perf_counter()
+    flushed = quota.counters.flush(conn)
+    flush_s = time.perf_counter() - t0
+    conn.close()
+
+    # Same request with and without enforcement, limits high enough never to refuse
+    quota.DASHBOARD_LIMIT = quota.IP_LIMITS["dashboard"] = args.requests * 4
+    client = app.app.test_client()
+    route = "/api/v1/candidates?username=bench_nobody"
+    timings = {}
+    for enforce in (False, True):
+        quota.QUOTA_ENFORCE = enforce
+        client.get(route)
+        t0 = time.perf_counter()
+        for _ in range(args.requests):
+            client.get(route)
+        timings[enforce] = (time.perf_counter() - t0) / args.requests
+
+    print(json.dumps({
+        "users": args.users,
+        "checks": args.checks,
+        "allowed": allowed,
+        "check_ns": round(check_s / args.checks * 1e9),
+        "flush_keys": flushed,
+        "flush_s": round(flush_s, 3),
+        "request_us_enforce_off": round(timings[False] * 1e6, 1),
+        "request_us_enforce_on": round(timings[True] * 1e6, 1),
+        "workdir": workdir,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_recommend.py  (offline recommendation job runtime)
+#
+#   python benchmarks/bench_recommend.py --brides 10000 --grooms 10000 --workers 4
+#   python benchmarks/bench_recommend.py --brides 100000 --grooms 100000 --workers 8
+#
+# Feeds synthetic like/dislike token sets straight into recommend.compute()
+# (no database), so the numbers are vectorizing + scoring + top-N only.
+# Tokens are the generator's hobbies plus a long tail of rarer interests,
+# drawn with Zipf-like weights the way free-text fields tend to look.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+def _tail_words(n):
+    # "interestaaa", "interestaab", ... (letter-only, so tokenize() would keep them)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["interest" + a + b + c for a, b, c in itertools.islice(itertools.product(letters, repeat=3), n)]
+
+def _sample(rng, cum_weights, k):
+    return rng.choices(range(len(cum_weights)), cum_weights=cum_weights, k=k)
+
+def _side(rng, n, words, cum_weights, prefix):
+    def draw(k):
+        return {words[i] for i in _sample(rng, cum_weights, k)}
+    names = [f"{prefix}{i}" for i in range(n)]
+    likes = [draw(rng.randint(1, 6)) for _ in range(n)]
+    dislikes = [draw(rng.randint(0, 3)) for _ in range(n)]
+    return names, likes, dislikes
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--brides", type=int, default=10000)
+    parser.add_argument("--grooms", type=int, default=10000)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-mb", type=int, default=256)
+    parser.add_argument("--tail", type=int, default=2000, help="rare interest tokens on top of the hobbies")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import recommend
+    import generate_data
+
+    rng = random.Random(args.seed)
+    words = [recommend._stem(h.lower()) for h in generate_data.HOBBIES] + _tail_words(args.tail)
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(words))))
+
+    t0 = time.perf_counter()
+    brides = _side(rng, args.brides, words, cum_weights, "b")
+    grooms = _side(rng, args.grooms, words, cum_weights, "g")
+    generate_s = time.perf_counter() - t0
+
+    timings = {}
+    t0 = time.perf_counter()
+    rows = sum(1 for _ in recommend.compute(brides, grooms, args.top, args.workers,
+                                            chunk_mb=args.chunk_mb, timings=timings))
+    total_s = time.perf_counter() - t0
+
+    pairs = 2 * args.brides * args.grooms
+    print(json.dumps({
+        "brides": args.brides,
+        "grooms": args.grooms,
+        "workers": args.workers or os.cpu_count(),
+        "vocabulary": len(words),
+        "generate_s": round(generate_s, 2),
+        "vectorize_s": round(timings["vectorize_s"], 2),
+        "score_s": round(timings["score_s"], 2),
+        "total_s": round(total_s, 2),
+        "rows": rows,
+        "pairs_per_s": round(pairs / total_s),
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
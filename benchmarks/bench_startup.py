@@ -0,0 +1,68 @@
+# bench_startup.py  (cold-start cost of a worker process)
+#
+#   python app.py migrate
+#   python benchmarks/bench_startup.py --runs 10
+#
+# Every run is a fresh interpreter, like a newly spawned worker. Reports how
+# long `import app`, create_app() and the first couple of requests take, so
+# spawn / autoscaling cold starts can be compared across commits.
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.create_app()
+t2 = time.perf_counter()
+client = app.app.test_client()
+client.get("/")
+t3 = time.perf_counter()
+client.post("/chat", json={"message": "hi"})
+t4 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "first_page_ms": (t3 - t2) * 1000,
+    "first_chat_ms": (t4 - t3) * 1000,
+    "total_ms": (t4 - t0) * 1000,
+    "groq_imported": "groq" in sys.modules,
+}))
+"""
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--db", help="database to start against (default: the app's)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, LOG_SAMPLE_RATE="0")
+    if args.db:
+        env["DATABASE_PATH"] = os.path.abspath(args.db)
+
+    runs = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True)
+        if out.returncode != 0:
+            sys.exit(out.stderr)
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    # The first run also pays for writing .pyc files; report it separately
+    steady = runs[1:] or runs
+    report = {"runs": args.runs, "first_run": {k: round(v, 1) if isinstance(v, float) else v for k, v in runs[0].items()}}
+    for key in ("import_ms", "create_app_ms", "first_page_ms", "first_chat_ms", "total_ms"):
+        values = [r[key] for r in steady]
+        report[key] = {"median": round(statistics.median(values), 1), "min": round(min(values), 1)}
+    report["groq_imported"] = any(r["groq_imported"] for r in runs)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
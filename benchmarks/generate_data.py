@@ -0,0 +1,201 @@
+# generate_data.py  (synthetic profiles, requests and chat for benchmarking)
+#
+#   python benchmarks/generate_data.py --db bench.db --brides 10000 --grooms 10000 \
+#       --requests-per-user 3 --messages 200000 --seed 42
+#
+# Builds a fresh database through the app's own migration (create_app with
+# auto_migrate) so the schema always matches the app, then bulk-loads rows
+# with executemany in large transactions.
+# Every generated user has the password "bench@123".
+
+import os
+import sys
+import time
+import random
+import argparse
+import itertools
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "bench@123"
+
+# (city, state, relative weight) - big metros dominate like real sign-ups
+CITIES = [
+    ("Delhi", "Delhi", 30), ("Mumbai", "Maharashtra", 28), ("Bangalore", "Karnataka", 24),
+    ("Hyderabad", "Telangana", 16), ("Chennai", "Tamil Nadu", 15), ("Kolkata", "West Bengal", 14),
+    ("Pune", "Maharashtra", 13), ("Ahmedabad", "Gujarat", 11), ("Jaipur", "Rajasthan", 9),
+    ("Lucknow", "Uttar Pradesh", 8), ("Ghaziabad", "Uttar Pradesh", 7), ("Noida", "Uttar Pradesh", 7),
+    ("Chandigarh", "Chandigarh", 6), ("Indore", "Madhya Pradesh", 6), ("Bhopal", "Madhya Pradesh", 5),
+    ("Patna", "Bihar", 5), ("Nagpur", "Maharashtra", 5), ("Surat", "Gujarat", 5),
+    ("Vadodara", "Gujarat", 4), ("Kochi", "Kerala", 4), ("Thiruvananthapuram", "Kerala", 3),
+    ("Ludhiana", "Punjab", 3), ("Amritsar", "Punjab", 3), ("Coimbatore", "Tamil Nadu", 3),
+    ("Visakhapatnam", "Andhra Pradesh", 3), ("Bhubaneswar", "Odisha", 2), ("Guwahati", "Assam", 2),
+    ("Dehradun", "Uttarakhand", 2), ("Shimla", "Himachal Pradesh", 1), ("Warangal", "Telangana", 1),
+    ("Solapur", "Maharashtra", 1), ("Ambala", "Haryana", 1), ("Ranchi", "Jharkhand", 1),
+    ("Raipur", "Chhattisgarh", 1), ("Mysore", "Karnataka", 1),
+]
+FIRST_BRIDE = ["Aditi", "Ananya", "Priya", "Kavya", "Isha", "Neha", "Pooja", "Riya", "Sneha", "Tanvi", "Meera", "Nisha"]
+FIRST_GROOM = ["Aarav", "Rahul", "Rohan", "Karan", "Vikram", "Arjun", "Amit", "Nikhil", "Siddharth", "Varun", "Manoj", "Sahil"]
+LAST = ["Sharma", "Verma", "Gupta", "Iyer", "Nair", "Patel", "Reddy", "Joshi", "Mehta", "Singh", "Das", "Kulkarni"]
+PROFESSIONS = ["Engineer", "Doctor", "Teacher", "Banker", "Lawyer", "Architect", "Designer", "Manager", "Data Scientist", "CA"]
+EDUCATION = ["B.Tech", "MBBS", "MBA", "B.Com", "M.Sc", "LLB", "B.Arch", "PhD", "BBA", "CA"]
+DIETS = ["Vegetarian", "Vegetarian", "Non-Vegetarian", "Eggetarian", "Vegan"]
+COMPLEXIONS = ["Fair", "Very Fair", "Wheatish", "Dusky"]
+HOBBIES = ["Reading", "Travelling", "Cricket", "Football", "Music", "Dancing", "Cooking", "Painting",
+           "Photography", "Trekking", "Movies", "Yoga", "Chess", "Gardening", "Swimming", "Writing"]
+STATUSES = ["Waiting", "Waiting", "Approved"]
+
+PROFILE_COLUMNS = """
+    full_name, email_id, phone_number, country, state, city, address, diet, complexion,
+    height, weight, image, video, username, password, manglik, date_of_birth, age,
+    profession, package, education, likes, dislikes, location_id
+"""
+
+def _age_and_dob(rng, today):
+    # Skewed toward mid/late twenties
+    age = max(21, min(45, int(rng.gauss(28, 4))))
+    dob = today - timedelta(days=age * 365 + rng.randint(0, 364))
+    age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+    return age, dob.isoformat()
+
+def _profile_rows(rng, kind, count, password_hash, city_weights, location_ids):
+    today = date.today()
+    first_names = FIRST_BRIDE if kind == "bride" else FIRST_GROOM
+    for i in range(count):
+        city, state = rng.choices(CITIES, cum_weights=city_weights)[0][:2]
+        age, dob = _age_and_dob(rng, today)
+        name = f"{rng.choice(first_names)} {rng.choice(LAST)}"
+        username = f"{kind}_{i:07d}"
+        feet, inches = (5, rng.randint(0, 11)) if kind == "bride" else (rng.choice([5, 5, 6]), rng.randint(0, 11))
+        yield (
+            name, f"{username}@example.com", f"9{rng.randint(100000000, 999999999)}",
+            "India", state, city, f"{rng.randint(1, 999)} Main Road, {city}",
+            rng.choice(DIETS), rng.choice(COMPLEXIONS),
+            f"{feet} Feet {inches} Inches", f"{rng.randint(45, 95)} KG",
+            f"{username}/image1.jpeg", None, username, password_hash,
+            rng.choice(["Yes", "No", "No"]), dob, age,
+            rng.choice(PROFESSIONS), f"{rng.randint(4, 60)} LPA", rng.choice(EDUCATION),
+            ", ".join(rng.sample(HOBBIES, rng.randint(1, 4))),
+            ", ".join(rng.sample(HOBBIES, rng.randint(1, 2))),
+            location_ids[city, state],
+        )
+
+def _batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def generate(db_path, brides, grooms, requests_per_user, messages, seed=42, batch=5000):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.environ["DATABASE_PATH"] = db_path
+
+    import app
+    import geo
+    import ages
+    import auth
+    import message_store
+
+    app.create_app(auto_migrate=True, recover_chat_log=False)
+
+    rng = random.Random(seed)
+    city_weights = list(itertools.accumulate(w for _, _, w in CITIES))
+    location_ids = {(city, state): geo.resolve(city, state) for city, state, _ in CITIES}
+    password_hash = auth.hash_password(PASSWORD)   # one KDF run shared by every row
+
+    conn = app.get_db()
+    c = conn.cursor()
+    counts = {}
+
+    t0 = time.perf_counter()
+    for kind, table, count in (("bride", "Bride_profile", brides), ("groom", "Groom_profile", grooms)):
+        for rows in _batched(_profile_rows(rng, kind, count, password_hash, city_weights, location_ids), batch):
+            c.executemany(f"INSERT INTO {table} ({PROFILE_COLUMNS}) VALUES ({','.join('?' * 24)})", rows)
+        conn.commit()
+        counts[table] = count
+
+    # Requests: per-bride fan-out is geometric-ish around requests_per_user,
+    # direction split evenly between bride->groom and groom->bride
+    pairs = set()
+    request_rows = []
+    for b in range(brides):
+        fan_out = min(grooms, int(rng.expovariate(1.0 / requests_per_user))) if requests_per_user else 0
+        for g in rng.sample(range(grooms), fan_out):
+            if (b, g) in pairs:
+                continue
+            pairs.add((b, g))
+            bride, groom = f"bride_{b:07d}", f"groom_{g:07d}"
+            sender, receiver = (bride, groom) if rng.random() < 0.5 else (groom, bride)
+            request_rows.append((sender, receiver, rng.choice(STATUSES)))
+    for rows in _batched(request_rows, batch):
+        c.executemany("INSERT INTO Requests (sender, receiver, status) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    counts["Requests"] = len(request_rows)
+
+    # Messages: only approved pairs chat; a few rooms are very busy
+    approved = [r for r in request_rows if r[2] == "Approved"]
+    if approved and messages:
+        user_ids, rooms = {}, []
+        for sender, receiver, _ in approved:
+            for u in (sender, receiver):
+                user_ids.setdefault(u, len(user_ids) + 1)
+            bride, groom = (sender, receiver) if sender.startswith("bride") else (receiver, sender)
+            rooms.append((f"{bride}_{groom}", len(rooms) + 1, bride, groom))
+        c.executemany("INSERT INTO Chat_users (id, username) VALUES (?, ?)", [(i, u) for u, i in user_ids.items()])
+        c.executemany("INSERT INTO Chat_rooms (id, room_id) VALUES (?, ?)", [(r[1], r[0]) for r in rooms])
+
+        # Zipf-like room activity: a few very busy rooms, a long quiet tail
+        room_cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(rooms))))
+        ts = int(time.time()) - 180 * 86400
+        last = {}
+
+        def message_rows():
+            nonlocal ts
+            for n in range(messages):
+                room_id, room, bride, groom = rng.choices(rooms, cum_weights=room_cum_weights)[0]
+                sender, receiver = (bride, groom) if rng.random() < 0.5 else (groom, bride)
+                ts += rng.randint(1, max(1, 180 * 86400 // messages))
+                text = f"message {n} " + " ".join(rng.sample(HOBBIES, 3))
+                last[room_id] = (sender, receiver, text, ts)
+                yield (room, user_ids[sender], user_ids[receiver], ts, text)
+
+        for rows in _batched(message_rows(), batch):
+            c.executemany("INSERT INTO Chat_messages (room, sender, receiver, ts, message) VALUES (?, ?, ?, ?, ?)", rows)
+        for room_id, (sender, receiver, text, m_ts) in last.items():
+            m_date, m_time = message_store.split_ts(m_ts)
+            app._upsert_conversation(c, room_id, sender, receiver, text, m_date, m_time)
+        conn.commit()
+    counts["Chat_messages"] = messages if approved else 0
+
+    ages.refresh_ages(c)
+    c.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    counts["seconds"] = round(time.perf_counter() - t0, 2)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--brides", type=int, default=1000)
+    parser.add_argument("--grooms", type=int, default=1000)
+    parser.add_argument("--requests-per-user", type=float, default=3)
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # app resolves faqs.json / templates relative to the repo root
+    db_path = os.path.abspath(args.db)
+    os.chdir(ROOT)
+    counts = generate(db_path, args.brides, args.grooms, args.requests_per_user, args.messages, args.seed)
+    print(counts)
+
+if __name__ == "__main__":
+    main()
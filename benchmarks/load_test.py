@@ -0,0 +1,110 @@
+# load_test.py  (HTTP requests/sec + concurrent Socket.IO connections against a running server)
+#
+# Start the server in one shell, run the load test in another:
+#
+#   python app.py                                   # dev server (threading, debug)
+#   python serve.py                                 # green-thread worker (gevent)
+#
+#   python benchmarks/load_test.py --url http://127.0.0.1:5000 --paths / /about /conversations?username=a \
+#       --concurrency 50 --duration 15 --sockets 500
+#
+# Start the server with QUOTA_ENFORCE=0, or the per-IP daily quotas cut the run short.
+# Socket connections need the client extra:  pip install "python-socketio[client]"
+# Output is one JSON object so runs against both servers can be diffed.
+
+import json
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+def http_worker(url, paths, deadline, stats, lock):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    latencies, errors, i = [], 0, 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        t = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 500:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - t)
+    conn.close()
+    with lock:
+        stats["latencies"].extend(latencies)
+        stats["errors"] += errors
+
+def open_sockets(url, count):
+    import socketio
+
+    clients, failed = [], 0
+    for _ in range(count):
+        client = socketio.Client(reconnection=False)
+        try:
+            client.connect(url, transports=["websocket"], wait_timeout=10)
+            clients.append(client)
+        except Exception:
+            failed += 1
+    return clients, failed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--paths", nargs="+", default=["/", "/about", "/membership"])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--sockets", type=int, default=0, help="Socket.IO clients held open during the run")
+    args = parser.parse_args()
+
+    clients, socket_failures = [], 0
+    if args.sockets:
+        clients, socket_failures = open_sockets(args.url, args.sockets)
+
+    stats = {"latencies": [], "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(target=http_worker, args=(args.url, args.paths, deadline, stats, lock))
+        for _ in range(args.concurrency)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    connected_at_end = sum(1 for c in clients if c.connected)
+    for c in clients:
+        c.disconnect()
+
+    lat = sorted(stats["latencies"])
+    pct = lambda q: round(lat[min(len(lat) - 1, int(len(lat) * q))] * 1000, 2) if lat else None
+    print(json.dumps({
+        "benchmark": "load_test",
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": len(lat),
+        "errors": stats["errors"],
+        "requests_per_sec": round(len(lat) / elapsed, 1),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "sockets_requested": args.sockets,
+        "sockets_connected": len(clients),
+        "sockets_failed": socket_failures,
+        "sockets_alive_at_end": connected_at_end,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
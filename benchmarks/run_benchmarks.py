@@ -0,0 +1,162 @@
+# run_benchmarks.py  (time hot routes through the Flask test client, emit JSON)
+#
+#   python benchmarks/generate_data.py --db bench.db --brides 10000 --grooms 10000 --messages 200000
+#   python benchmarks/run_benchmarks.py --db bench.db --iterations 50 --out results/$(git rev-parse --short HEAD).json
+#
+# Each benchmark reports mean/p50/p95/max in milliseconds plus the SQL
+# statement count of one representative request. Results carry the git
+# commit so files from different commits can be compared directly.
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _summary(samples):
+    ms = sorted(s * 1000 for s in samples)
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(ms[len(ms) // 2], 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+def _sql_total(metrics):
+    return sum(state[-1] for state in metrics.SQL_LATENCY._values.values())
+
+def _timed(fn, iterations, warmup=2):
+    for _ in range(warmup):
+        fn(0)
+    samples = []
+    for i in range(iterations):
+        t = time.perf_counter()
+        resp = fn(i)
+        samples.append(time.perf_counter() - t)
+        assert resp.status_code < 500, (resp.status_code, resp.data[:200])
+    return samples
+
+def run(db_path, iterations, seed=7, only=None):
+    # Settings must be in the environment before app/auth are imported
+    os.environ["DATABASE_PATH"] = db_path
+    os.environ.setdefault("LOGIN_RATE_BURST", "1000000")
+    os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+    # One user repeats each page far past any daily quota; bench_quota.py covers the checks
+    os.environ.setdefault("QUOTA_ENFORCE", "0")
+
+    import app
+    import metrics
+
+    app.create_app(auto_migrate=True)
+
+    rng = random.Random(seed)
+    conn = app.get_db()
+    brides = [r[0] for r in conn.execute("SELECT username FROM Bride_profile ORDER BY id LIMIT 500")]
+    grooms = [r[0] for r in conn.execute("SELECT username FROM Groom_profile ORDER BY id LIMIT 500")]
+    busiest = conn.execute("""
+        SELECT c.room_id, c.username, c.peer
+        FROM Conversations c
+        JOIN Chat_rooms r ON r.room_id = c.room_id
+        WHERE r.id = (SELECT room FROM Chat_messages GROUP BY room ORDER BY COUNT(*) DESC LIMIT 1)
+        LIMIT 1
+    """).fetchone()
+    cities = [r[0] for r in conn.execute("SELECT DISTINCT city FROM Bride_profile LIMIT 20")]
+    counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+              for t in ("Bride_profile", "Groom_profile", "Requests", "Chat_messages")}
+    conn.close()
+
+    client = app.app.test_client()
+    benches = {}
+
+    benches["bride_dashboard"] = lambda i: client.get(f"/bride-profile/{rng.choice(brides)}")
+    benches["groom_dashboard"] = lambda i: client.get(f"/groom-profile/{rng.choice(grooms)}")
+    benches["bride_dashboard_within_100km"] = lambda i: client.get(f"/bride-profile/{rng.choice(brides)}?within_km=100")
+    benches["candidates_api_within_250km"] = lambda i: client.get(
+        f"/api/v1/candidates?username={rng.choice(brides)}&within_km=250&limit=200")
+
+    benches["groom_complete_profile"] = lambda i: client.get(
+        f"/groom-complete-profile/{rng.choice(grooms)}/{rng.choice(brides)}")
+    benches["profile_media"] = lambda i: client.get(f"/api/v1/profile/{rng.choice(grooms)}/media")
+
+    if busiest:
+        room_id, user, peer = busiest
+        benches["get_messages_busiest_room"] = lambda i: client.get(
+            f"/get_messages?room_id={room_id}&sender={user}&receiver={peer}")
+        benches["save_message"] = lambda i: client.post("/save_message", json={
+            "Sender": user, "Receiver": peer, "Message": f"bench {i}", "Room_ID": room_id})
+        benches["conversations"] = lambda i: client.get(f"/conversations?username={user}")
+
+    benches["chat_search"] = lambda i: client.post("/chat", json={
+        "message": f"show brides from {rng.choice(cities).lower()} age 24 to 30"})
+    benches["chat_search_within_km"] = lambda i: client.post("/chat", json={
+        "message": f"show grooms within 200 km of {rng.choice(cities).lower()} age 24 to 30"})
+    benches["chat_faq"] = lambda i: client.post("/chat", json={"message": "hi"})
+
+    benches["bride_login"] = lambda i: client.post("/bride-login", json={
+        "username": rng.choice(brides), "password": "bench@123"})
+
+    # Requests: send to a fresh pair, then cancel it, so the table stays the same size
+    def send_and_cancel(i):
+        pair = {"sender": rng.choice(brides), "receiver": f"bench_groom_{i}"}
+        resp = client.post("/send_request", json=pair)
+        client.post("/cancel_request", json=pair)
+        return resp
+    benches["send_request"] = send_and_cancel
+
+    results = {}
+    for name, fn in benches.items():
+        if only and name not in only:
+            continue
+        summary = _summary(_timed(fn, iterations))
+
+        # SQL statements for one more representative call
+        before = _sql_total(metrics)
+        fn(iterations)
+        summary["sql_statements"] = _sql_total(metrics) - before
+        results[name] = summary
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "db": os.path.basename(db_path),
+        "rows": counts,
+        "iterations": iterations,
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--only", nargs="*", help="benchmark names to run")
+    parser.add_argument("--out", help="write JSON here as well as stdout")
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    os.chdir(ROOT)   # app resolves faqs.json / templates relative to the repo root
+    report = run(db_path, args.iterations, only=args.only)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# chat_writer.py  (write-behind buffer for chat messages)
+#
+# /save_message appends the message to a local append-only log and returns;
+# a flush then applies everything buffered in one SQLite transaction. That
+# turns one fsync'd commit per message into one per batch.
+#
+# Each flush closes the current log segment and commits its records together
+# with the segment number (Chat_write_log, one row per log directory), so on
+# start-up segments newer than that writer's committed one are replayed
+# exactly once and older ones deleted.
+# A flush happens when CHAT_FLUSH_SIZE messages are buffered, every
+# CHAT_FLUSH_INTERVAL seconds (run_flusher), before a room with buffered
+# messages is read, and at shutdown. CHAT_FLUSH_INTERVAL=0 writes through.
+#
+# One writer per log directory: give each worker process its own CHAT_LOG_DIR.
+# Unset, the directory sits next to the database (jeevansathi.db ->
+# jeevansathi-chat-log/), so a log is only ever replayed into its own DB.
+#
+# A record the database refuses (bad types, constraint failures) is moved to
+# chat-rejects.jsonl in the log directory instead of blocking every later
+# batch; lock / I/O errors leave the batch queued for the next flush.
+
+import os
+import json
+import time
+import logging
+import sqlite3
+import threading
+
+import metrics
+import offload
+
+CHAT_LOG_DIR = os.getenv("CHAT_LOG_DIR")
+CHAT_FLUSH_INTERVAL = float(os.getenv("CHAT_FLUSH_INTERVAL", "0.2"))
+CHAT_FLUSH_SIZE = int(os.getenv("CHAT_FLUSH_SIZE", "500"))
+CHAT_LOG_FSYNC = os.getenv("CHAT_LOG_FSYNC", "0") == "1"   # 1: survive power loss, not just a crash
+
+log = logging.getLogger("jeevansathi")
+
+FLUSH_SIZE = metrics.Histogram("chat_flush_messages", "Messages applied per write-behind flush.",
+                               buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000))
+metrics.REGISTRY.append(FLUSH_SIZE)
+REJECTED = metrics.Counter("chat_rejected_total", "Buffered chat messages the database refused.")
+metrics.REGISTRY.append(REJECTED)
+
+# Problems with the record itself; retrying them can never succeed
+DATA_ERRORS = (sqlite3.InterfaceError, sqlite3.ProgrammingError, sqlite3.IntegrityError,
+               sqlite3.DataError, TypeError, ValueError)
+
+# -------------------- Schema --------------------
+def log_dir_for(db_path):
+    return CHAT_LOG_DIR or os.path.splitext(os.path.abspath(db_path))[0] + "-chat-log"
+
+def init_writer_table(cursor):
+    # Last log segment whose records are in the database, per writer (log directory)
+    cursor.execute("PRAGMA table_info(Chat_write_log)")
+    columns = [row[1] for row in cursor.fetchall()]
+    legacy = None
+    if "id" in columns:
+        # First layout had a single global row; it belonged to the then default ./chat-log
+        cursor.execute("SELECT segment FROM Chat_write_log WHERE id = 1")
+        legacy = cursor.fetchone()
+        cursor.execute("DROP TABLE Chat_write_log")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Chat_write_log (
+            writer TEXT PRIMARY KEY,
+            segment INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    if legacy:
+        cursor.execute("INSERT OR IGNORE INTO Chat_write_log (writer, segment) VALUES (?, ?)",
+                       (writer_key(CHAT_LOG_DIR or "chat-log"), legacy[0]))
+
+def writer_key(log_dir):
+    return os.path.abspath(log_dir)
+
+def _committed_segment(cursor, writer):
+    cursor.execute("SELECT segment FROM Chat_write_log WHERE writer = ?", (writer,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+# -------------------- Writer --------------------
+class ChatWriter:
+    def __init__(self, connect, write_batch, log_dir, flush_interval=CHAT_FLUSH_INTERVAL,
+                 flush_size=CHAT_FLUSH_SIZE, fsync=CHAT_LOG_FSYNC):
+        # write_batch(cursor, records) applies a list of records; it must not commit
+        self._connect = connect
+        self._write_batch = write_batch
+        self.log_dir = log_dir
+        self.writer = writer_key(log_dir)
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.fsync = fsync
+
+        self._lock = threading.Lock()           # buffer + current segment
+        self._flush_lock = threading.Lock()     # one flush at a time
+        self._records = []
+        self._keys = set()                      # rooms with buffered records
+        self._unwritten = []                    # [(segment, records)] closed, not yet committed
+        self._segment = None
+        self._file = None
+        self._closed = False
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def _path(self, segment):
+        return os.path.join(self.log_dir, f"chat-{segment:012d}.log")
+
+    def _segments_on_disk(self):
+        if not os.path.isdir(self.log_dir):
+            return []
+        found = []
+        for name in os.listdir(self.log_dir):
+            if name.startswith("chat-") and name.endswith(".log"):
+                try:
+                    found.append(int(name[5:-4]))
+                except ValueError:
+                    pass
+        return sorted(found)
+
+    def recover(self):
+        # Replay segments a crash left behind; call once before serving
+        os.makedirs(self.log_dir, exist_ok=True)
+        conn = self._connect()
+        committed = _committed_segment(conn.cursor(), self.writer)
+        conn.close()
+
+        replayed = 0
+        segments = self._segments_on_disk()
+        for segment in segments:
+            if segment > committed:
+                records = list(_read_log(self._path(segment)))
+                if records:
+                    replayed += self._commit(segment, records)
+            os.remove(self._path(segment))
+        self._segment = max([committed, *segments]) + 1
+        if replayed:
+            log.info("chat writer replayed %d messages from %s", replayed, self.log_dir)
+        return replayed
+
+    def submit(self, key, record):
+        # key groups records for has_pending() (the room id); record is JSON-able
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("chat writer is closed")
+            if self._segment is None:
+                self.recover()
+            if self._file is None:
+                self._file = open(self._path(self._segment), "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._records.append(record)
+            self._keys.add(key)
+            full = len(self._records) >= self.flush_size or self.flush_interval <= 0
+        if full:
+            self.flush()
+
+    def has_pending(self, key):
+        with self._lock:
+            return key in self._keys or bool(self._unwritten)
+
+    def pending(self):
+        with self._lock:
+            return len(self._records) + sum(len(r) for _, r in self._unwritten)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if self._records:
+                    # Seal the segment; new submits start the next one
+                    self._file.close()
+                    self._file = None
+                    self._unwritten.append((self._segment, self._records))
+                    self._segment += 1
+                    self._records = []
+                    self._keys = set()
+                batches = list(self._unwritten)
+
+            # A failed commit leaves the batch (and its segment file) queued for the next flush
+            for segment, records in batches:
+                offload.run_blocking(self._commit, segment, records)
+                with self._lock:
+                    self._unwritten.pop(0)
+                os.remove(self._path(segment))
+            return sum(len(r) for _, r in batches)
+
+    def _commit(self, segment, records):
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            try:
+                self._write_batch(cursor, records)
+            except DATA_ERRORS:
+                conn.rollback()
+                records = self._write_each(conn, cursor, segment, records)
+            cursor.execute("INSERT OR REPLACE INTO Chat_write_log (writer, segment) VALUES (?, ?)",
+                           (self.writer, segment))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        FLUSH_SIZE.observe(len(records))
+        return len(records)
+
+    def _write_each(self, conn, cursor, segment, records):
+        # Slow path after a failed batch: one savepoint per record, refused ones set aside
+        written, rejected = [], []
+        cursor.execute("BEGIN")
+        for record in records:
+            cursor.execute("SAVEPOINT record")
+            try:
+                self._write_batch(cursor, [record])
+                written.append(record)
+            except DATA_ERRORS as e:
+                cursor.execute("ROLLBACK TO record")
+                rejected.append({"segment": segment, "error": str(e), "record": record})
+            cursor.execute("RELEASE record")
+        if rejected:
+            # Durable before the watermark moves past this segment
+            with open(self._rejects_path(), "a", encoding="utf-8") as f:
+                for item in rejected:
+                    f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            REJECTED.inc(len(rejected))
+            log.error("chat writer set aside %d message(s) from segment %d in %s",
+                      len(rejected), segment, self._rejects_path())
+        return written
+
+    def _rejects_path(self):
+        return os.path.join(self.log_dir, "chat-rejects.jsonl")
+
+    def close(self):
+        # Flush whatever is buffered; registered with atexit by the app
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self.flush()
+        except Exception as e:
+            log.exception("chat writer final flush failed (log kept for replay): %s", e)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def _read_log(path):
+    # A torn last line (crash mid-append) is skipped
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def run_flusher(writer, sleep=time.sleep):
+    # Background loop for the interval trigger
+    while not writer.closed:
+        sleep(max(writer.flush_interval, 0.01))
+        try:
+            writer.flush()
+        except Exception as e:
+            log.exception("chat flush failed: %s", e)
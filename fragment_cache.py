@@ -0,0 +1,63 @@
+# fragment_cache.py  (rendered candidate-card HTML, reused across dashboard loads)
+
+import os
+import threading
+from collections import OrderedDict
+
+CARD_CACHE_SIZE = int(os.getenv("CARD_CACHE_SIZE", "20000"))
+
+class FragmentCache:
+    # LRU of rendered fragments. Keys are (kind, candidate username, ...) so
+    # every entry for one candidate can be dropped when their profile or
+    # request state is written.
+    def __init__(self, max_entries=CARD_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._by_candidate = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            html = self._data.get(key)
+            if html is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return html
+
+    def set(self, key, html):
+        candidate = key[:2]
+        with self._lock:
+            self._data[key] = html
+            self._data.move_to_end(key)
+            self._by_candidate.setdefault(candidate, set()).add(key)
+            while len(self._data) > self.max_entries:
+                old_key, _ = self._data.popitem(last=False)
+                self._forget(old_key)
+
+    def _forget(self, key):
+        keys = self._by_candidate.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_candidate[key[:2]]
+
+    def invalidate(self, kind, username):
+        with self._lock:
+            for key in self._by_candidate.pop((kind, username), ()):
+                self._data.pop(key, None)
+
+    def invalidate_user(self, username):
+        # Request writes only know usernames, not which side each one is
+        self.invalidate("bride", username)
+        self.invalidate("groom", username)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._by_candidate.clear()
+
+card_cache = FragmentCache()
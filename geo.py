@@ -0,0 +1,155 @@
+# geo.py  (offline gazetteer: city/state -> location id, "within N km" lookups)
+
+import os
+import re
+import json
+import math
+import threading
+from functools import lru_cache
+
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.json")
+)
+GRID_DEGREES = 1.0          # bucket size; ~111 km of latitude per cell
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.2
+MAX_RADIUS_KM = 3500.0      # roughly India end to end; larger radii mean "anywhere"
+
+# Abbreviations and old names people type into the state field
+STATE_ALIASES = {
+    "ap": "andhra pradesh", "ar": "arunachal pradesh", "as": "assam", "br": "bihar",
+    "cg": "chhattisgarh", "ch": "chandigarh", "dl": "delhi", "nct": "delhi", "new delhi": "delhi",
+    "ga": "goa", "gj": "gujarat", "hr": "haryana", "hp": "himachal pradesh",
+    "jk": "jammu and kashmir", "j k": "jammu and kashmir", "jammu kashmir": "jammu and kashmir",
+    "jh": "jharkhand", "ka": "karnataka", "kl": "kerala", "la": "ladakh", "mp": "madhya pradesh",
+    "mh": "maharashtra", "mn": "manipur", "ml": "meghalaya", "mz": "mizoram", "nl": "nagaland",
+    "od": "odisha", "or": "odisha", "orissa": "odisha", "pb": "punjab", "py": "puducherry",
+    "pondicherry": "puducherry", "rj": "rajasthan", "sk": "sikkim", "tn": "tamil nadu",
+    "ts": "telangana", "tg": "telangana", "tr": "tripura", "up": "uttar pradesh",
+    "uk": "uttarakhand", "ut": "uttarakhand", "uttaranchal": "uttarakhand", "wb": "west bengal",
+    "an": "andaman and nicobar islands",
+}
+
+def _fold(text):
+    # "Navi-Mumbai " / "navi mumbai" / "NAVI  MUMBAI" -> "navi mumbai"
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).split())
+
+def _fold_state(text):
+    state = _fold(text)
+    return STATE_ALIASES.get(state, state)
+
+def _cell(lat, lon):
+    return (math.floor(lat / GRID_DEGREES), math.floor(lon / GRID_DEGREES))
+
+def clamp_radius(km):
+    # User-supplied radius -> km capped at MAX_RADIUS_KM, or None when it
+    # isn't a positive finite number
+    if km is None:
+        return None
+    try:
+        km = float(km)
+    except OverflowError:
+        # Integers too large for a float (e.g. from the /chat regex)
+        return MAX_RADIUS_KM if km > 0 else None
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(km) or km <= 0:
+        return None
+    return min(km, MAX_RADIUS_KM)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+# -------------------- Gazetteer --------------------
+class Gazetteer:
+    def __init__(self, places):
+        self.places = {}
+        self._by_name = {}      # folded city name or alias -> [ids]
+        self._grid = {}         # (lat cell, lon cell) -> [ids]
+        for place in places:
+            pid = place["id"]
+            self.places[pid] = place
+            for name in [place["city"], *place.get("aliases", ())]:
+                ids = self._by_name.setdefault(_fold(name), [])
+                if pid not in ids:
+                    ids.append(pid)
+            self._grid.setdefault(_cell(place["lat"], place["lon"]), []).append(pid)
+
+    def resolve(self, city, state=None):
+        ids = self._by_name.get(_fold(city))
+        if not ids:
+            return None
+        if len(ids) > 1 and state:
+            # Same city name in several states: the state field picks one
+            wanted = _fold_state(state)
+            for pid in ids:
+                if _fold(self.places[pid]["state"]) == wanted:
+                    return pid
+        return ids[0]
+
+    def distance_km(self, a, b):
+        pa, pb = self.places.get(a), self.places.get(b)
+        if pa is None or pb is None:
+            return None
+        return haversine_km(pa["lat"], pa["lon"], pb["lat"], pb["lon"])
+
+    def within(self, location_id, km):
+        # ((id, distance), ...) nearest first; only grid cells that can hold a
+        # match are scanned, then an exact great-circle check per place
+        origin = self.places.get(location_id)
+        if origin is None or not km >= 0:     # also rejects NaN
+            return ()
+        km = min(km, MAX_RADIUS_KM)
+        lat, lon = origin["lat"], origin["lon"]
+        dlat = km / KM_PER_DEGREE_LAT
+        dlon = km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(min(abs(lat) + dlat, 89.0))), 0.01))
+        # The box never needs more than the whole globe, whatever the radius
+        dlon = min(dlon, 180.0)
+        lat_lo, lon_lo = _cell(max(lat - dlat, -90.0), lon - dlon)
+        lat_hi, lon_hi = _cell(min(lat + dlat, 90.0), lon + dlon)
+
+        found = []
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lon_lo, lon_hi + 1):
+                for pid in self._grid.get((i, j), ()):
+                    place = self.places[pid]
+                    d = haversine_km(lat, lon, place["lat"], place["lon"])
+                    if d <= km:
+                        found.append((pid, round(d, 1)))
+        found.sort(key=lambda item: item[1])
+        return tuple(found)
+
+_gazetteer = None
+_lock = threading.Lock()
+
+def gazetteer():
+    # Loaded on first use so importing the app stays cheap
+    global _gazetteer
+    if _gazetteer is None:
+        with _lock:
+            if _gazetteer is None:
+                with open(GAZETTEER_PATH, encoding="utf-8") as f:
+                    _gazetteer = Gazetteer(json.load(f))
+    return _gazetteer
+
+# -------------------- Lookups --------------------
+def resolve(city, state=None):
+    return gazetteer().resolve(city, state)
+
+def place(location_id):
+    return gazetteer().places.get(location_id)
+
+def distance_km(a, b):
+    d = gazetteer().distance_km(a, b)
+    return round(d, 1) if d is not None else None
+
+@lru_cache(maxsize=4096)
+def _within(location_id, km):
+    return gazetteer().within(location_id, km)
+
+def within(location_id, km):
+    # {location id: km from location_id}, including location_id itself at 0
+    return dict(_within(location_id, float(km)))
@@ -0,0 +1,66 @@
+# json_api.py  (compact JSON responses: projection, fast encoding, compression, ETags)
+
+import gzip
+import json
+import hashlib
+
+from flask import request, Response
+
+# Optional accelerators; plain json / gzip are used when they are missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def parse_fields(allowed):
+    # ?fields=a,b,c -> ordered subset of `allowed`; missing/empty -> everything
+    raw = request.args.get("fields")
+    if not raw:
+        return list(allowed)
+    wanted = [f.strip() for f in raw.split(",") if f.strip()]
+    return [f for f in wanted if f in allowed]
+
+def project(record, fields):
+    return {f: record.get(f) for f in fields}
+
+def _accepts(encoding):
+    return encoding in request.accept_encodings and request.accept_encodings[encoding] > 0
+
+def respond(payload, status=200):
+    body = dumps(payload)
+
+    # Weak ETag over the uncompressed body; unchanged data -> 304 with no body
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    if request.method == "GET" and request.if_none_match.contains_weak(etag):
+        resp = Response(status=304)
+        resp.set_etag(etag, weak=True)
+        resp.headers["Vary"] = "Accept-Encoding"
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+
+    encoding = None
+    if len(body) >= MIN_COMPRESS_BYTES:
+        if brotli is not None and _accepts("br"):
+            body, encoding = brotli.compress(body, quality=5), "br"
+        elif _accepts("gzip"):
+            body, encoding = gzip.compress(body, compresslevel=6), "gzip"
+
+    resp = Response(body, status=status, mimetype="application/json")
+    resp.set_etag(etag, weak=True)
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = "private, no-cache"
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    return resp
@@ -0,0 +1,293 @@
+# message_store.py  (compact chat storage + archive tiering)
+
+import os
+import gzip
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+import offload
+
+# Relative archive paths (the setting, and manifest rows written before paths
+# were stored absolute) resolve against the app directory, not the cwd
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_DIR = os.getenv("MESSAGE_ARCHIVE_DIR", "archive")
+ARCHIVE_AFTER_DAYS = int(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_INTERVAL = int(os.getenv("MESSAGE_ARCHIVE_INTERVAL", "3600"))
+ARCHIVE_CACHE_ROWS = int(os.getenv("MESSAGE_ARCHIVE_CACHE_ROWS", "200000"))
+
+log = logging.getLogger("jeevansathi")
+
+# -------------------- Schema --------------------
+def init_message_tables(cursor):
+    # Interned usernames / room ids so every message row is integers + text
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Chat_users (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Chat_rooms (
+            id INTEGER PRIMARY KEY,
+            room_id TEXT NOT NULL UNIQUE
+        )
+    """)
+
+    # Hot tier: recent messages only
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Chat_messages (
+            id INTEGER PRIMARY KEY,
+            room INTEGER NOT NULL,
+            sender INTEGER NOT NULL,
+            receiver INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            message TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chat_messages_room_ts
+        ON Chat_messages (room, ts)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chat_messages_ts
+        ON Chat_messages (ts)
+    """)
+
+    # Cold tier: one row per compressed segment file
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Chat_segments (
+            id INTEGER PRIMARY KEY,
+            room INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            first_ts INTEGER NOT NULL,
+            last_ts INTEGER NOT NULL,
+            message_count INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_chat_segments_room
+        ON Chat_segments (room, first_ts)
+    """)
+
+def migrate_legacy_messages(cursor):
+    # Move rows from the old TEXT-only Messages table into the compact table
+    cursor.execute("SELECT id, sender, receiver, message, room_id, date, time FROM Messages ORDER BY id")
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    for _id, sender, receiver, message, room_id, m_date, m_time in rows:
+        ts = _to_epoch(m_date, m_time)
+        insert_message(cursor, room_id, sender, receiver, message, ts)
+
+    cursor.execute("DELETE FROM Messages WHERE id <= ?", (rows[-1][0],))
+    return len(rows)
+
+# -------------------- Interning --------------------
+def _intern(cursor, table, column, value):
+    cursor.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,))
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    cursor.execute(f"INSERT INTO {table} ({column}) VALUES (?)", (value,))
+    return cursor.lastrowid
+
+def user_id(cursor, username):
+    return _intern(cursor, "Chat_users", "username", username)
+
+def room_key(cursor, room_id):
+    return _intern(cursor, "Chat_rooms", "room_id", room_id)
+
+def _lookup(cursor, table, column, value):
+    cursor.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+# -------------------- Timestamps --------------------
+def _to_epoch(m_date, m_time):
+    try:
+        return int(datetime.strptime(f"{m_date} {m_time}", "%Y-%m-%d %H:%M:%S").timestamp())
+    except (TypeError, ValueError):
+        return int(time.time())
+
+def split_ts(ts):
+    dt = datetime.fromtimestamp(ts)
+    return dt.strftime("%Y-%m-%d"), dt.strftime("%H:%M:%S")
+
+# -------------------- Read / Write --------------------
+def insert_message(cursor, room_id, sender, receiver, message, ts=None):
+    if ts is None:
+        ts = int(time.time())
+    cursor.execute("""
+        INSERT INTO Chat_messages (room, sender, receiver, ts, message)
+        VALUES (?, ?, ?, ?, ?)
+    """, (room_key(cursor, room_id), user_id(cursor, sender), user_id(cursor, receiver), ts, message))
+    return ts
+
+def fetch_messages(cursor, room_id, sender, receiver):
+    # Returns (sender, receiver, message, room_id, date, time) tuples, oldest first,
+    # reading archived segments before the hot table.
+    room = _lookup(cursor, "Chat_rooms", "room_id", room_id)
+    sender_id = _lookup(cursor, "Chat_users", "username", sender)
+    receiver_id = _lookup(cursor, "Chat_users", "username", receiver)
+    if room is None or sender_id is None or receiver_id is None:
+        return []
+
+    pair = {(sender_id, receiver_id), (receiver_id, sender_id)}
+    names = {sender_id: sender, receiver_id: receiver}
+    out = []
+
+    cursor.execute("""
+        SELECT path FROM Chat_segments
+        WHERE room = ?
+        ORDER BY first_ts ASC, id ASC
+    """, (room,))
+    for (path,) in cursor.fetchall():
+        for s_id, r_id, ts, message in _read_segment(path):
+            if (s_id, r_id) in pair:
+                out.append((names[s_id], names[r_id], message, room_id) + split_ts(ts))
+
+    cursor.execute("""
+        SELECT sender, receiver, ts, message
+        FROM Chat_messages
+        WHERE room = ?
+        AND ((sender = ? AND receiver = ?) OR (sender = ? AND receiver = ?))
+        ORDER BY ts ASC, id ASC
+    """, (room, sender_id, receiver_id, receiver_id, sender_id))
+    for s_id, r_id, ts, message in cursor.fetchall():
+        out.append((names[s_id], names[r_id], message, room_id) + split_ts(ts))
+
+    return out
+
+def iter_all_messages(cursor):
+    # (room_id, sender, receiver, message, ts) for every hot row, oldest first
+    cursor.execute("""
+        SELECT r.room_id, s.username, v.username, m.message, m.ts
+        FROM Chat_messages m
+        JOIN Chat_rooms r ON r.id = m.room
+        JOIN Chat_users s ON s.id = m.sender
+        JOIN Chat_users v ON v.id = m.receiver
+        ORDER BY m.ts ASC, m.id ASC
+    """)
+    return cursor.fetchall()
+
+# -------------------- Archive Tiering --------------------
+class SegmentCache:
+    # Decoded archive segments by path, LRU-bounded by total rows. A segment
+    # file is never rewritten (each cut gets a new path), so entries can't go
+    # stale; this keeps the 2 s /get_messages poll from gunzipping every time.
+    def __init__(self, max_rows=ARCHIVE_CACHE_ROWS):
+        self.max_rows = max_rows
+        self._data = OrderedDict()
+        self._rows = 0
+        self._missing = set()       # paths already reported
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        path = _resolve(path)
+        with self._lock:
+            rows = self._data.get(path)
+            if rows is not None:
+                self._data.move_to_end(path)
+                return rows
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                rows = tuple(tuple(json.loads(line)) for line in f if line.strip())
+        except FileNotFoundError:
+            # The manifest still lists it: archived history is missing, say so
+            with self._lock:
+                first = path not in self._missing
+                self._missing.add(path)
+            if first:
+                log.error("archived chat segment missing: %s", path)
+            return ()
+        if len(rows) > self.max_rows:
+            return rows
+        with self._lock:
+            if path not in self._data:
+                self._data[path] = rows
+                self._rows += len(rows)
+                while self._rows > self.max_rows:
+                    _, evicted = self._data.popitem(last=False)
+                    self._rows -= len(evicted)
+        return rows
+
+segment_cache = SegmentCache()
+
+def _resolve(path):
+    return os.path.join(APP_ROOT, path) if not os.path.isabs(path) else path
+
+def _read_segment(path):
+    return segment_cache.get(path)
+
+def _write_segment(path, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as raw:
+        with gzip.open(raw, "wt", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, separators=(",", ":"), ensure_ascii=False))
+                f.write("\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+
+def archive_old_messages(conn, archive_dir=ARCHIVE_DIR, older_than_days=ARCHIVE_AFTER_DAYS):
+    # Move every hot message older than the cutoff into one new segment per room.
+    # The segment file is durable before the manifest row is committed and the
+    # hot rows are deleted, so a crash can only leave an unreferenced file behind.
+    cutoff = int(time.time()) - older_than_days * 86400
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT room FROM Chat_messages WHERE ts < ?", (cutoff,))
+    rooms = [r[0] for r in cursor.fetchall()]
+
+    archived = 0
+    for room in rooms:
+        # Hold the write lock while the segment is cut so two archivers can't both take it
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            SELECT id, sender, receiver, ts, message
+            FROM Chat_messages
+            WHERE room = ? AND ts < ?
+            ORDER BY ts ASC, id ASC
+        """, (room, cutoff))
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            continue
+
+        last_id = max(r[0] for r in rows)
+        path = os.path.join(_resolve(archive_dir), str(room), f"{rows[0][3]}-{last_id}.jsonl.gz")
+        _write_segment(path, [[r[1], r[2], r[3], r[4]] for r in rows])
+
+        cursor.execute("""
+            INSERT INTO Chat_segments (room, path, first_ts, last_ts, message_count)
+            VALUES (?, ?, ?, ?, ?)
+        """, (room, path, rows[0][3], rows[-1][3], len(rows)))
+        cursor.executemany("DELETE FROM Chat_messages WHERE id = ?", [(r[0],) for r in rows])
+        conn.commit()
+        archived += len(rows)
+
+    return archived
+
+def _archive_pass(connect):
+    conn = connect()
+    try:
+        return archive_old_messages(conn)
+    finally:
+        conn.close()
+
+def run_archiver(connect, sleep=time.sleep, interval=ARCHIVE_INTERVAL):
+    # Background loop; `connect` returns a fresh sqlite3 connection,
+    # `sleep` lets Socket.IO swap in its cooperative sleep. Each pass (lock,
+    # gzip, fsync) runs on a real thread so a green worker's hub keeps serving.
+    while True:
+        try:
+            offload.run_blocking(_archive_pass, connect)
+        except Exception as e:
+            log.exception("message archiver failed: %s", e)
+        sleep(interval)
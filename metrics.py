@@ -0,0 +1,171 @@
+# metrics.py  (request / SQL / Socket.IO / LLM instrumentation, Prometheus text format)
+
+import os
+import json
+import time
+import random
+import sqlite3
+import logging
+import threading
+
+from flask import g, request, has_request_context
+
+import offload
+
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+
+log = logging.getLogger("jeevansathi")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)
+
+# -------------------- Metric Types --------------------
+def _fmt_labels(names, values, extra=""):
+    pairs = [f'{n}="{str(v).replace(chr(34), "")}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_fmt_labels(self.labels, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self._values = {}   # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    state[i] += 1
+            state[-2] += seconds
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for i, bound in enumerate(self.buckets):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {state[i]}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {state[-1]}")
+                lines.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {state[-2]:.6f}")
+                lines.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {state[-1]}")
+        return lines
+
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("endpoint", "method", "status"))
+REQUEST_SQL_QUERIES = Histogram("http_request_sql_queries", "SQL statements executed per request.", ("endpoint",),
+                                buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 1000))
+SQL_LATENCY = Histogram("sql_query_duration_seconds", "SQLite statement latency.", buckets=SQL_BUCKETS)
+SOCKETIO_EMITS = Counter("socketio_emits_total", "Socket.IO events emitted.", ("event",))
+LLM_LATENCY = Histogram("llm_request_duration_seconds", "Groq completion latency.", ("model", "outcome"))
+
+REGISTRY = [REQUEST_LATENCY, REQUEST_SQL_QUERIES, SQL_LATENCY, SOCKETIO_EMITS, LLM_LATENCY]
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# -------------------- SQLite Wrapper --------------------
+def _record_sql(elapsed):
+    SQL_LATENCY.observe(elapsed)
+    if has_request_context():
+        g.sql_count = g.get("sql_count", 0) + 1
+        g.sql_time = g.get("sql_time", 0.0) + elapsed
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # Lock waits go through offload.retry_busy so they yield under gevent
+    def execute(self, sql, parameters=()):
+        t = time.perf_counter()
+        try:
+            return offload.retry_busy(super().execute, sql, parameters)
+        finally:
+            _record_sql(time.perf_counter() - t)
+
+    def executemany(self, sql, seq_of_parameters):
+        t = time.perf_counter()
+        try:
+            # An iterator can't be replayed after a partial attempt
+            if isinstance(seq_of_parameters, (list, tuple)):
+                return offload.retry_busy(super().executemany, sql, seq_of_parameters)
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_sql(time.perf_counter() - t)
+
+class InstrumentedConnection(sqlite3.Connection):
+    # Pass as sqlite3.connect(..., factory=InstrumentedConnection)
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        return offload.retry_busy(super().commit)
+
+# -------------------- Flask Hooks --------------------
+def init_app(app):
+    if not log.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+        g.sql_count = 0
+        g.sql_time = 0.0
+
+    @app.after_request
+    def _record_request(response):
+        start = g.get("request_start")
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unmatched"
+        REQUEST_LATENCY.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+        REQUEST_SQL_QUERIES.observe(g.sql_count, endpoint=endpoint)
+
+        # Sampled structured log; slow requests and errors are always logged
+        ms = elapsed * 1000
+        if ms >= SLOW_REQUEST_MS or response.status_code >= 500 or random.random() < LOG_SAMPLE_RATE:
+            log.info(json.dumps({
+                "endpoint": endpoint,
+                "method": request.method,
+                "path": request.path,
+                "view_args": request.view_args,
+                "status": response.status_code,
+                "ms": round(ms, 2),
+                "sql_count": g.sql_count,
+                "sql_ms": round(g.sql_time * 1000, 2),
+            }))
+        return response
@@ -0,0 +1,93 @@
+# offload.py  (run blocking calls without stalling green-thread workers)
+
+import os
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# How long a statement may wait for SQLite's write lock in total, and (under a
+# green worker) the longest single wait inside SQLite, which blocks the hub
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5"))
+SQLITE_GREEN_BUSY_MS = int(os.getenv("SQLITE_GREEN_BUSY_MS", "20"))
+
+_mode = None
+
+def green_mode():
+    # "gevent" / "eventlet" once serve.py has monkey-patched, else None
+    global _mode
+    if _mode is None:
+        _mode = ""
+        try:
+            from gevent import monkey
+            if monkey.is_module_patched("threading"):
+                _mode = "gevent"
+        except ImportError:
+            pass
+        if not _mode:
+            try:
+                from eventlet import patcher
+                if patcher.is_monkey_patched("thread"):
+                    _mode = "eventlet"
+            except ImportError:
+                pass
+    return _mode or None
+
+def run_blocking(fn, *args, **kwargs):
+    # Under a green-thread worker, push the call onto a real OS thread so the
+    # hub keeps serving other requests and sockets; otherwise call inline.
+    mode = green_mode()
+    if mode == "gevent":
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args, kwargs)
+    if mode == "eventlet":
+        from eventlet import tpool
+        return tpool.execute(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+# -------------------- SQLite Lock Waits --------------------
+def sqlite_timeout():
+    # Value for sqlite3.connect(timeout=...)
+    return SQLITE_GREEN_BUSY_MS / 1000 if green_mode() else SQLITE_BUSY_TIMEOUT
+
+def _is_busy(e):
+    message = str(e)
+    return "locked" in message or "busy" in message
+
+def retry_busy(fn, *args):
+    # Under a green worker the connection's busy timeout is only a few ms; the
+    # rest of the wait happens here, in a (patched) sleep that yields the hub
+    if not green_mode():
+        return fn(*args)
+    deadline = time.monotonic() + SQLITE_BUSY_TIMEOUT
+    delay = 0.005
+    while True:
+        try:
+            return fn(*args)
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or time.monotonic() >= deadline:
+                raise
+        time.sleep(delay)
+        delay = min(delay * 2, 0.1)
+
+class BoundedOffload:
+    # At most `workers` calls in flight, on real threads in every serving mode
+    def __init__(self, workers, name):
+        self.workers = workers
+        self.name = name
+        self._pool = None
+        self._sem = None
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args, **kwargs):
+        if green_mode():
+            if self._sem is None:
+                self._sem = threading.BoundedSemaphore(self.workers)  # green-aware once patched
+            with self._sem:
+                return run_blocking(fn, *args, **kwargs)
+
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.name)
+        return self._pool.submit(fn, *args, **kwargs).result()
@@ -0,0 +1,317 @@
+# profile_io.py  (bulk profile import / export: CSV or JSONL, batched, streaming)
+#
+#   python profile_io.py import --kind bride --format csv brides.csv --media-dir dump/media
+#   python profile_io.py export --kind groom --format jsonl --out grooms.jsonl
+#
+# Imports stream the dump, validate each record, and insert in batches with
+# executemany (one transaction per batch). Rejected records go to a JSONL
+# rejects file with their line number and reasons; the rest still load.
+# Exports stream rows straight from the cursor, so memory stays flat.
+
+import io
+import os
+import re
+import csv
+import sys
+import json
+import time
+import shutil
+import argparse
+from datetime import date
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.utils import secure_filename
+
+import geo
+import ages
+import auth
+import offload
+
+TABLES = {"bride": "Bride_profile", "groom": "Groom_profile"}
+FORMATS = ("csv", "jsonl")
+BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+
+# Column order of the INSERT; matches the create-profile forms
+COLUMNS = (
+    "full_name", "email_id", "phone_number", "country", "state", "city", "address", "diet", "complexion",
+    "height", "weight", "image", "video", "username", "password", "manglik", "date_of_birth", "age",
+    "profession", "package", "education", "likes", "dislikes", "location_id", "age_next_update",
+)
+EXPORT_COLUMNS = tuple(c for c in COLUMNS if c not in ("password", "age_next_update"))
+
+# Dumps taken from the signup forms use the form field names
+FIELD_ALIASES = {"email": "email_id", "phone": "phone_number", "dob": "date_of_birth", "images": "image"}
+
+# Also a media directory name under uploads/, so no leading '.' ("." / "..")
+USERNAME_RE = re.compile(r"^(?!\.)[A-Za-z0-9_.\-]{1,64}$")
+
+# -------------------- Reading --------------------
+def read_records(stream, fmt):
+    # Yields (line number, dict) from a text stream
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, {"__error__": f"invalid JSON: {e}"}
+                continue
+            yield line_no, record if isinstance(record, dict) else {"__error__": "not a JSON object"}
+    else:
+        raise ValueError(f"unknown format {fmt!r}")
+
+def _clean(record):
+    out = {}
+    for key, value in record.items():
+        if key is None:
+            continue
+        key = FIELD_ALIASES.get(key.strip(), key.strip())
+        if isinstance(value, str):
+            value = value.strip() or None
+        out[key] = value
+    return out
+
+# -------------------- Validation --------------------
+def validate(record, today=None):
+    # Returns (clean record, [errors])
+    if "__error__" in record:
+        return None, [record["__error__"]]
+    today = today or date.today()
+    rec = _clean(record)
+    errors = []
+
+    username = rec.get("username")
+    if not username:
+        errors.append("username is required")
+    elif not USERNAME_RE.match(str(username)):
+        errors.append("username may only contain letters, digits, '_', '.' and '-', and may not start with '.'")
+    else:
+        rec["username"] = str(username)
+    if not rec.get("full_name"):
+        errors.append("full_name is required")
+
+    # Age always comes from date_of_birth when there is one
+    dob = rec.get("date_of_birth")
+    if dob:
+        try:
+            born = date.fromisoformat(str(dob))
+            rec["date_of_birth"] = born.isoformat()
+            rec["age"] = ages.age_on(born, today)
+            rec["age_next_update"] = ages.next_birthday(born, today).isoformat()
+        except ValueError:
+            errors.append("date_of_birth must be YYYY-MM-DD")
+    elif rec.get("age") is not None:
+        try:
+            rec["age"] = int(rec["age"])
+        except (TypeError, ValueError):
+            errors.append("age must be a whole number")
+    if isinstance(rec.get("age"), int) and not ages.MIN_AGE <= rec["age"] <= ages.MAX_AGE:
+        errors.append(f"age must be between {ages.MIN_AGE} and {ages.MAX_AGE}")
+
+    # JSONL can carry lists / objects; only image may be a list (of paths)
+    for key in COLUMNS:
+        value = rec.get(key)
+        if key == "image" and isinstance(value, list) and all(isinstance(v, str) for v in value):
+            rec["image"] = ",".join(value)
+        elif key == "image" and isinstance(value, list):
+            errors.append("image must be a path or a list of paths")
+        elif value is not None and not isinstance(value, (str, int, float)):
+            errors.append(f"{key} must be a single value")
+        elif key == "password" and value is not None and not isinstance(value, str):
+            errors.append("password must be text")
+    return rec, errors
+
+# -------------------- Media --------------------
+def _place_file(src, dest):
+    # Hard link when the dump sits on the same filesystem; copy otherwise
+    try:
+        os.link(src, dest)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(src, dest)
+
+def import_media(rec, media_dir, upload_dir):
+    # Paths in the dump are relative to media_dir; they land in
+    # uploads/<username>/ exactly like form uploads do
+    username = rec["username"]
+    user_dir = os.path.join(upload_dir, username)
+    missing = []
+
+    def move(rel):
+        src = os.path.join(media_dir, rel.replace("\\", "/"))
+        if not os.path.isfile(src):
+            missing.append(rel)
+            return None
+        fn = secure_filename(os.path.basename(src))
+        os.makedirs(user_dir, exist_ok=True)
+        _place_file(src, os.path.join(user_dir, fn))
+        return f"{username}/{fn}"
+
+    images = [p.strip() for p in (rec.get("image") or "").split(",") if p.strip()]
+    rec["image"] = ",".join(filter(None, map(move, images)))
+    if rec.get("video"):
+        rec["video"] = move(rec["video"])
+    return missing
+
+# -------------------- Import --------------------
+def _existing_usernames(cursor):
+    cursor.execute("SELECT username FROM Bride_profile UNION SELECT username FROM Groom_profile")
+    return {row[0] for row in cursor.fetchall()}
+
+def _hash_passwords(records, pool):
+    # Dumps from another install may already carry hashes; plaintext is
+    # hashed across the pool (hashlib.scrypt releases the GIL)
+    plain = [r for r in records if r.get("password") and not auth.is_hashed(r["password"])]
+    mapper = pool.map if pool is not None else map
+    for rec, hashed in zip(plain, mapper(auth.hash_password, [r["password"] for r in plain])):
+        rec["password"] = hashed
+
+def import_profiles(conn, kind, stream, fmt, media_dir=None, upload_dir="uploads",
+                    rejects=None, batch_size=BATCH_SIZE, dry_run=False):
+    table = TABLES[kind]
+    cursor = conn.cursor()
+    seen = _existing_usernames(cursor)
+    locations = {}
+    today = date.today()
+    stats = {"read": 0, "imported": 0, "rejected": 0, "missing_media": 0}
+    sql = f"INSERT INTO {table} ({', '.join(COLUMNS)}) VALUES ({','.join('?' * len(COLUMNS))})"
+
+    def reject(line_no, record, errors):
+        stats["rejected"] += 1
+        if rejects is not None:
+            record = {k: v for k, v in record.items() if k != "password"}
+            rejects.write(json.dumps({"line": line_no, "errors": errors, "record": record}, default=str) + "\n")
+
+    def flush(batch, pool):
+        if not batch:
+            return
+        if not dry_run:
+            _hash_passwords(batch, pool)
+            try:
+                cursor.executemany(sql, [tuple(rec.get(c) for c in COLUMNS) for rec in batch])
+                conn.commit()
+            except Exception:
+                # Don't leave the batch's write lock held on the shared database
+                conn.rollback()
+                raise
+        stats["imported"] += len(batch)
+        batch.clear()
+
+    # Under gevent/eventlet the executor's threads would be greenlets; hash inline there
+    batch = []
+    with (nullcontext() if offload.green_mode() else ThreadPoolExecutor(max_workers=auth.KDF_WORKERS)) as pool:
+        for line_no, record in read_records(stream, fmt):
+            stats["read"] += 1
+            rec, errors = validate(record, today)
+            if not errors and rec["username"] in seen:
+                errors.append("username already exists")
+            if errors:
+                reject(line_no, record, errors)
+                continue
+            seen.add(rec["username"])
+
+            key = (rec.get("city"), rec.get("state"))
+            if key not in locations:
+                locations[key] = geo.resolve(*key) if key[0] else None
+            rec["location_id"] = locations[key]
+
+            if media_dir and not dry_run:
+                missing = import_media(rec, media_dir, upload_dir)
+                stats["missing_media"] += len(missing)
+
+            batch.append(rec)
+            if len(batch) >= batch_size:
+                flush(batch, pool)
+        flush(batch, pool)
+    return stats
+
+# -------------------- Export --------------------
+def export_profiles(conn, kind, fmt, with_passwords=False, chunk=1000):
+    # Generator of text chunks; the header (CSV) comes first
+    columns = COLUMNS if with_passwords else EXPORT_COLUMNS
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT {', '.join(columns)} FROM {TABLES[kind]} ORDER BY id")
+
+    buf = io.StringIO()
+    writer = csv.writer(buf) if fmt == "csv" else None
+    if writer:
+        writer.writerow(columns)
+    while True:
+        rows = cursor.fetchmany(chunk)
+        if not rows:
+            break
+        for row in rows:
+            if writer:
+                writer.writerow(["" if v is None else v for v in row])
+            else:
+                buf.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+# -------------------- CLI --------------------
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of bride and groom profiles")
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", "jeevansathi.db"))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import")
+    imp.add_argument("path", help="CSV/JSONL dump, or - for stdin")
+    imp.add_argument("--kind", choices=TABLES, required=True)
+    imp.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    imp.add_argument("--media-dir", help="directory the image/video paths in the dump are relative to")
+    imp.add_argument("--upload-dir", default="uploads")
+    imp.add_argument("--rejects", help="write rejected records here (JSONL)")
+    imp.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    imp.add_argument("--dry-run", action="store_true", help="validate only")
+
+    exp = sub.add_parser("export")
+    exp.add_argument("--kind", choices=TABLES, required=True)
+    exp.add_argument("--format", choices=FORMATS, default="jsonl")
+    exp.add_argument("--out", help="default: stdout")
+    exp.add_argument("--with-passwords", action="store_true", help="include password hashes")
+
+    args = parser.parse_args()
+
+    # Same schema check / migration as the app itself
+    os.environ["DATABASE_PATH"] = os.path.abspath(args.db)
+    import app
+    app.create_app(auto_migrate=True, recover_chat_log=False)
+    conn = app.connect_db()
+
+    if args.command == "import":
+        fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+        stream = sys.stdin if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+        rejects = open(args.rejects, "w", encoding="utf-8") if args.rejects else None
+        t0 = time.perf_counter()
+        try:
+            stats = import_profiles(conn, args.kind, stream, fmt, media_dir=args.media_dir,
+                                    upload_dir=args.upload_dir, rejects=rejects,
+                                    batch_size=args.batch_size, dry_run=args.dry_run)
+        finally:
+            if rejects:
+                rejects.close()
+            if stream is not sys.stdin:
+                stream.close()
+        stats["seconds"] = round(time.perf_counter() - t0, 2)
+        print(json.dumps(stats))
+    else:
+        out = open(args.out, "w", newline="", encoding="utf-8") if args.out else sys.stdout
+        for text in export_profiles(conn, args.kind, args.format, with_passwords=args.with_passwords):
+            out.write(text)
+        if out is not sys.stdout:
+            out.close()
+    conn.close()
+
+if __name__ == "__main__":
+    main()
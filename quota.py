@@ -0,0 +1,217 @@
+# quota.py  (daily view / interest quotas per plan, plus per-IP caps)
+#
+# Counters live in memory as a sliding-window estimate over two fixed
+# windows (current day + previous day weighted by how much of it still
+# overlaps), so a check is a dict lookup and a little arithmetic under one
+# lock. Hits are flushed to Quota_counters as deltas every
+# QUOTA_FLUSH_INTERVAL seconds and merged back, so a restart keeps today's
+# counts and several workers converge on shared totals.
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import metrics
+import offload
+
+QUOTA_ENFORCE = os.getenv("QUOTA_ENFORCE", "1") == "1"
+QUOTA_WINDOW = int(os.getenv("QUOTA_WINDOW", "86400"))
+QUOTA_FLUSH_INTERVAL = int(os.getenv("QUOTA_FLUSH_INTERVAL", "30"))
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", "300"))
+PLAN_CACHE_MAX = int(os.getenv("PLAN_CACHE_MAX", "100000"))
+
+# Per user per day; paid tiers are the Basic / Premium / Ultimate cards on /membership
+DEFAULT_PLAN = "free"
+PLAN_LIMITS = {
+    "free":     {"view": 20,  "interest": 5},
+    "basic":    {"view": 50,  "interest": 15},
+    "premium":  {"view": 150, "interest": 40},
+    "ultimate": {"view": 500, "interest": 100},
+}
+# Per user (any plan) and per client IP per day; these are the anti-scraping caps
+DASHBOARD_LIMIT = int(os.getenv("QUOTA_DASHBOARD_PER_USER", "300"))
+IP_LIMITS = {
+    "view": int(os.getenv("QUOTA_IP_VIEWS", "1000")),
+    "interest": int(os.getenv("QUOTA_IP_INTERESTS", "200")),
+    "dashboard": int(os.getenv("QUOTA_IP_DASHBOARDS", "1000")),
+}
+
+log = logging.getLogger("jeevansathi")
+
+DENIED = metrics.Counter("quota_denied_total", "Requests refused by a daily quota.", ("action", "scope"))
+metrics.REGISTRY.append(DENIED)
+
+# -------------------- Schema --------------------
+def init_quota_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Quota_counters (
+            key TEXT PRIMARY KEY,
+            period INTEGER NOT NULL,
+            current INTEGER NOT NULL,
+            previous INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+# -------------------- Counters --------------------
+class SlidingWindowCounters:
+    def __init__(self, window=QUOTA_WINDOW):
+        self.window = window
+        self._counts = {}       # key -> [period (window index), current, previous, unflushed hits]
+        self._lock = threading.Lock()
+
+    def _entry(self, key, idx):
+        entry = self._counts.get(key)
+        if entry is None:
+            entry = self._counts[key] = [idx, 0, 0, 0]
+        elif entry[0] != idx:
+            # Roll forward: yesterday's count becomes "previous", older ones drop out
+            entry[2] = entry[1] if entry[0] == idx - 1 else 0
+            entry[0], entry[1] = idx, 0
+        return entry
+
+    def allow(self, checks, now=None):
+        # checks: [(key, limit)]; either every key is charged one hit or none.
+        # Returns None when allowed, else the first key over its limit.
+        now = time.time() if now is None else now
+        idx, offset = divmod(now, self.window)
+        idx, overlap = int(idx), 1 - offset / self.window
+        with self._lock:
+            entries = []
+            for key, limit in checks:
+                entry = self._entry(key, idx)
+                if entry[2] * overlap + entry[1] + 1 > limit:
+                    return key
+                entries.append(entry)
+            for entry in entries:
+                entry[1] += 1
+                entry[3] += 1
+        return None
+
+    def used(self, key, now=None):
+        now = time.time() if now is None else now
+        idx, offset = divmod(now, self.window)
+        with self._lock:
+            entry = self._entry(key, int(idx))
+            return entry[2] * (1 - offset / self.window) + entry[1]
+
+    def load(self, cursor, now=None):
+        idx = int((time.time() if now is None else now) // self.window)
+        cursor.execute("SELECT key, period, current, previous FROM Quota_counters WHERE period >= ?", (idx - 1,))
+        with self._lock:
+            for key, period, current, previous in cursor.fetchall():
+                self._counts[key] = [period, current, previous, 0]
+
+    def flush(self, conn, now=None):
+        # Add this process's unflushed hits, then take the merged totals back
+        idx = int((time.time() if now is None else now) // self.window)
+        with self._lock:
+            deltas = [(key, e[0], e[3]) for key, e in self._counts.items() if e[3]]
+            for key, _, _ in deltas:
+                self._counts[key][3] = 0
+        cursor = conn.cursor()
+        try:
+            cursor.executemany("""
+                INSERT INTO Quota_counters (key, period, current, previous) VALUES (?, ?, ?, 0)
+                ON CONFLICT (key) DO UPDATE SET
+                    previous = CASE WHEN excluded.period = period THEN previous
+                                    WHEN excluded.period = period + 1 THEN current ELSE 0 END,
+                    current = CASE WHEN excluded.period = period THEN current + excluded.current
+                                   ELSE excluded.current END,
+                    period = excluded.period
+                WHERE excluded.period >= period
+            """, deltas)
+            cursor.execute("DELETE FROM Quota_counters WHERE period < ?", (idx - 1,))
+            conn.commit()
+        except Exception:
+            # Put the hits back so the next flush retries them
+            with self._lock:
+                for key, period, delta in deltas:
+                    entry = self._counts.get(key)
+                    if entry is not None and entry[0] == period:
+                        entry[3] += delta
+            raise
+
+        merged = []
+        keys = [key for key, _, _ in deltas]
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            cursor.execute(f"SELECT key, period, current, previous FROM Quota_counters "
+                           f"WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            merged.extend(cursor.fetchall())
+        with self._lock:
+            for key, period, current, previous in merged:
+                entry = self._counts.get(key)
+                if entry is not None and entry[0] == period:
+                    entry[1], entry[2] = current + entry[3], previous
+            # Keys idle for two windows carry nothing
+            stale = [k for k, e in self._counts.items() if e[0] < idx - 1 and not e[3]]
+            for key in stale:
+                del self._counts[key]
+        return len(deltas)
+
+counters = SlidingWindowCounters()
+
+# -------------------- Plans --------------------
+class PlanCache:
+    # username -> plan, LRU-bounded with expiry so plan changes show up within the TTL
+    def __init__(self, loader, ttl=PLAN_CACHE_TTL, max_entries=PLAN_CACHE_MAX):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(username)
+            if item is not None and item[1] > now:
+                self._data.move_to_end(username)
+                return item[0]
+        plan = self._loader(username) or DEFAULT_PLAN
+        with self._lock:
+            self._data[username] = (plan, now + self.ttl)
+            self._data.move_to_end(username)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return plan
+
+    def forget(self, username):
+        with self._lock:
+            self._data.pop(username, None)
+
+def limit_for(plan, action):
+    return PLAN_LIMITS.get(plan, PLAN_LIMITS[DEFAULT_PLAN])[action]
+
+# -------------------- Checks --------------------
+def check(action, username, ip, plan=None, now=None):
+    # True if allowed (and charged). plan=None: the action has no plan limit.
+    # username=None (not logged in): the user allowance is counted per IP
+    if not QUOTA_ENFORCE:
+        return True
+    user_limit = DASHBOARD_LIMIT if plan is None else limit_for(plan, action)
+    who = f"user:{username}" if username else f"anon:{ip}"
+    over = counters.allow([(f"{action}:{who}", user_limit),
+                           (f"{action}:ip:{ip}", IP_LIMITS[action])], now)
+    if over is None:
+        return True
+    DENIED.inc(action=action, scope=over.split(":")[1])
+    return False
+
+def _flush_pass(connect):
+    conn = connect()
+    try:
+        return counters.flush(conn)
+    finally:
+        conn.close()
+
+def run_quota_flusher(connect, sleep=time.sleep, interval=QUOTA_FLUSH_INTERVAL):
+    # Each flush runs on a real thread (offload), off a green worker's hub
+    while True:
+        sleep(interval)
+        try:
+            offload.run_blocking(_flush_pass, connect)
+        except Exception as e:
+            log.exception("quota flush failed: %s", e)
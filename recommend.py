@@ -0,0 +1,208 @@
+# recommend.py  (offline match recommendations from likes / dislikes)
+#
+#   python recommend.py --top 20 --workers 4
+#
+# Likes and dislikes are tokenized into TF-IDF sparse vectors. A pair scores
+# high when their likes overlap and low when one side likes what the other
+# dislikes:
+#
+#   score(b, g) = cos(L_b, L_g) - w/2 * (cos(L_b, D_g) + cos(D_b, L_g))
+#
+# which is a single sparse product per chunk: [L_b, D_b] . [L_g - w*D_g, -w*L_g]^T.
+# Chunks of rows are scored in worker processes, the top N per user kept with
+# argpartition, staged in a TEMP table, and then swapped into Recommendations
+# in one short transaction so the dashboards never see a half-written set.
+#
+# Needs numpy and scipy (pip install numpy scipy); the web app itself does not,
+# it only reads the table.
+
+import os
+import re
+import json
+import math
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+TOP_N = int(os.getenv("RECOMMEND_TOP_N", "20"))
+DISLIKE_WEIGHT = float(os.getenv("RECOMMEND_DISLIKE_WEIGHT", "0.5"))
+CHUNK_MEMORY_MB = int(os.getenv("RECOMMEND_CHUNK_MB", "256"))
+
+TOKEN_RE = re.compile(r"[a-z]+")
+STOPWORDS = {
+    "and", "the", "for", "with", "from", "into", "very", "much", "more", "most", "also", "etc",
+    "like", "likes", "love", "loves", "enjoy", "enjoys", "dislike", "dislikes", "hate", "hates",
+    "not", "dont", "doing", "being", "things", "stuff", "people", "all", "any", "some", "other",
+}
+
+# -------------------- Tokenizing --------------------
+def _stem(word):
+    # Just enough to fold "movies"/"movie", "sports"/"sport"
+    if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def tokenize(text):
+    return {_stem(w) for w in TOKEN_RE.findall((text or "").lower()) if len(w) > 2 and w not in STOPWORDS}
+
+class Vocabulary:
+    def __init__(self, token_sets):
+        # IDF over every likes/dislikes field on both sides
+        df = {}
+        for tokens in token_sets:
+            for t in tokens:
+                df[t] = df.get(t, 0) + 1
+        self.index = {t: i for i, t in enumerate(sorted(df))}
+        n = len(token_sets)
+        self.idf = np.array([math.log((1 + n) / (1 + df[t])) + 1 for t in sorted(df)], dtype=np.float32)
+
+    def vectors(self, token_sets):
+        # L2-normalised TF-IDF rows (binary term frequency), CSR float32
+        indptr, indices = [0], []
+        for tokens in token_sets:
+            indices.extend(sorted(self.index[t] for t in tokens if t in self.index))
+            indptr.append(len(indices))
+        indices = np.asarray(indices, dtype=np.int32)
+        data = self.idf[indices] if len(indices) else np.zeros(0, dtype=np.float32)
+        m = sparse.csr_matrix((data, indices, np.asarray(indptr, dtype=np.int64)),
+                              shape=(len(token_sets), len(self.index)), dtype=np.float32)
+        norms = np.sqrt(m.multiply(m).sum(axis=1)).A1
+        norms[norms == 0] = 1.0
+        return sparse.csr_matrix(sparse.diags(1.0 / norms).dot(m), dtype=np.float32)
+
+# -------------------- Scoring --------------------
+_worker = {}
+
+def _init_worker(left, right_t, top_n):
+    _worker.update(left=left, right_t=right_t, top_n=top_n)
+
+def _score_chunk(bounds):
+    start, end = bounds
+    scores = (_worker["left"][start:end] @ _worker["right_t"]).toarray()
+    n = min(_worker["top_n"], scores.shape[1])
+    if n == 0:
+        return start, np.zeros((end - start, 0), dtype=np.int32), np.zeros((end - start, 0), dtype=np.float32)
+    top = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    return start, np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+def top_matches(left, right_t, top_n=TOP_N, workers=None, chunk_mb=CHUNK_MEMORY_MB):
+    # Yields (row index, candidate indices, scores) in row order. Chunk height
+    # keeps each dense score block near chunk_mb of float32.
+    rows, cols = left.shape[0], right_t.shape[1]
+    chunk = max(1, min(rows, (chunk_mb * 1024 * 1024) // max(1, cols * 4)))
+    bounds = [(s, min(rows, s + chunk)) for s in range(0, rows, chunk)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(bounds) == 1:
+        _init_worker(left, right_t, top_n)
+        results = map(_score_chunk, bounds)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(left, right_t, top_n))
+        results = pool.map(_score_chunk, bounds)
+    try:
+        for start, idx, vals in results:
+            for offset in range(idx.shape[0]):
+                keep = vals[offset] > 0
+                yield start + offset, idx[offset][keep], vals[offset][keep]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def pair_matrices(likes_a, dislikes_a, likes_b, dislikes_b, dislike_weight=DISLIKE_WEIGHT):
+    # Left rows for side a, right (transposed) for side b; see the header
+    left = sparse.hstack([likes_a, dislikes_a], format="csr")
+    right = sparse.hstack([likes_b - dislike_weight * dislikes_b, -dislike_weight * likes_b], format="csr")
+    return left, right.T.tocsc()
+
+# -------------------- Job --------------------
+def _load(cursor, table):
+    cursor.execute(f"SELECT username, likes, dislikes FROM {table} WHERE username IS NOT NULL ORDER BY id")
+    rows = cursor.fetchall()
+    return [r[0] for r in rows], [tokenize(r[1]) for r in rows], [tokenize(r[2]) for r in rows]
+
+def compute(brides, grooms, top_n=TOP_N, workers=None, dislike_weight=DISLIKE_WEIGHT,
+            chunk_mb=CHUNK_MEMORY_MB, timings=None):
+    # brides / grooms: (usernames, like token sets, dislike token sets).
+    # Yields (username, rank, candidate, score) for both directions.
+    timings = timings if timings is not None else {}
+    t = time.perf_counter()
+    vocab = Vocabulary(brides[1] + brides[2] + grooms[1] + grooms[2])
+    lb, db = vocab.vectors(brides[1]), vocab.vectors(brides[2])
+    lg, dg = vocab.vectors(grooms[1]), vocab.vectors(grooms[2])
+    timings["vectorize_s"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    for names, cands, side_a, side_b in (
+        (brides[0], grooms[0], (lb, db), (lg, dg)),
+        (grooms[0], brides[0], (lg, dg), (lb, db)),
+    ):
+        left, right_t = pair_matrices(*side_a, *side_b, dislike_weight=dislike_weight)
+        for row, idx, vals in top_matches(left, right_t, top_n, workers, chunk_mb):
+            for rank, (j, score) in enumerate(zip(idx.tolist(), vals.tolist()), 1):
+                yield names[row], rank, cands[j], round(score, 4)
+    timings["score_s"] = time.perf_counter() - t
+
+def run(conn, top_n=TOP_N, workers=None, dislike_weight=DISLIKE_WEIGHT, chunk_mb=CHUNK_MEMORY_MB):
+    cursor = conn.cursor()
+    t0 = time.perf_counter()
+    brides = _load(cursor, "Bride_profile")
+    grooms = _load(cursor, "Groom_profile")
+    load_s = time.perf_counter() - t0
+
+    # Score into a TEMP staging table first: it lives outside the main database,
+    # so app writers are not held off while compute() runs
+    cursor.execute("DROP TABLE IF EXISTS temp.Recommendations_staging")
+    cursor.execute("CREATE TEMP TABLE Recommendations_staging AS SELECT * FROM Recommendations WHERE 0")
+    timings = {}
+    cursor.execute("BEGIN")
+    cursor.executemany(
+        "INSERT INTO temp.Recommendations_staging (username, rank, candidate, score) VALUES (?, ?, ?, ?)",
+        compute(brides, grooms, top_n, workers, dislike_weight, chunk_mb, timings),
+    )
+    cursor.execute("COMMIT")
+
+    # Then swap the whole set in one short transaction; readers keep the old one until commit
+    t1 = time.perf_counter()
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("DELETE FROM Recommendations")
+    before = conn.total_changes
+    cursor.execute("INSERT INTO Recommendations (username, rank, candidate, score) "
+                   "SELECT username, rank, candidate, score FROM temp.Recommendations_staging")
+    written = conn.total_changes - before
+    cursor.execute("COMMIT")
+    timings["swap_s"] = time.perf_counter() - t1
+    cursor.execute("DROP TABLE temp.Recommendations_staging")
+
+    stats = {"brides": len(brides[0]), "grooms": len(grooms[0]), "rows": written, "load_s": round(load_s, 2)}
+    stats.update({k: round(v, 2) for k, v in timings.items()})
+    stats["total_s"] = round(time.perf_counter() - t0, 2)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the Recommendations table")
+    parser.add_argument("--db", default=os.getenv("DATABASE_PATH", "jeevansathi.db"))
+    parser.add_argument("--top", type=int, default=TOP_N, help="recommendations kept per user")
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes (default: CPU count)")
+    parser.add_argument("--dislike-weight", type=float, default=DISLIKE_WEIGHT)
+    parser.add_argument("--chunk-mb", type=int, default=CHUNK_MEMORY_MB, help="dense score block size per task")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_PATH"] = os.path.abspath(args.db)
+    import app
+    app.create_app(auto_migrate=True, recover_chat_log=False)
+
+    # Plain connection: the app's instrumented cursor would time every insert
+    import sqlite3
+    conn = sqlite3.connect(app.DB_PATH, isolation_level=None)
+    stats = run(conn, args.top, args.workers, args.dislike_weight, args.chunk_mb)
+    conn.close()
+    print(json.dumps(stats))
+
+if __name__ == "__main__":
+    main()
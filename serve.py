@@ -0,0 +1,30 @@
+# serve.py  (production entry point: green-thread worker for HTTP + Socket.IO)
+#
+#   python app.py migrate        # once per deploy, before workers start
+#   SOCKETIO_ASYNC_MODE=gevent HOST=0.0.0.0 PORT=5000 python serve.py
+#
+# app.py's __main__ block stays the local development server. Workers do not
+# run DDL: create_app() refuses to start on an old schema unless AUTO_MIGRATE=1.
+
+import os
+
+ASYNC_MODE = os.getenv("SOCKETIO_ASYNC_MODE", "gevent")
+os.environ["SOCKETIO_ASYNC_MODE"] = ASYNC_MODE
+
+# Patch sockets/threads before anything else imports them
+if ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+elif ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+
+from app import create_app, socketio, start_background_jobs  # noqa: E402
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
+
+if __name__ == "__main__":
+    app = create_app()
+    start_background_jobs()
+    socketio.run(app, host=HOST, port=PORT, debug=False, use_reloader=False, log_output=False)
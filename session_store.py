@@ -0,0 +1,173 @@
+# session_store.py  (server-side sessions: cookie carries only an opaque id)
+
+import os
+import time
+import secrets
+import threading
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")   # "sqlite" | "memory"
+SESSION_MEMORY_MAX = int(os.getenv("SESSION_MEMORY_MAX", "10000"))
+
+_serializer = TaggedJSONSerializer()
+
+# -------------------- Schema --------------------
+def init_session_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS Sessions (
+            sid TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sessions_expires
+        ON Sessions (expires)
+    """)
+
+# -------------------- Stores --------------------
+class SQLiteSessionStore:
+    def __init__(self, connect, purge_every=1000):
+        self._connect = connect
+        self.purge_every = purge_every
+        self._writes = 0
+
+    def get(self, sid):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT data FROM Sessions WHERE sid = ? AND expires > ?", (sid, int(time.time()))
+        ).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def set(self, sid, data, ttl):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO Sessions (sid, data, expires) VALUES (?, ?, ?)",
+            (sid, data, int(time.time() + ttl))
+        )
+        # Expired rows are swept occasionally rather than on every request
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            conn.execute("DELETE FROM Sessions WHERE expires <= ?", (int(time.time()),))
+        conn.commit()
+        conn.close()
+
+    def delete(self, sid):
+        conn = self._connect()
+        conn.execute("DELETE FROM Sessions WHERE sid = ?", (sid,))
+        conn.commit()
+        conn.close()
+
+class MemorySessionStore:
+    # Single-process only; LRU-bounded with per-entry expiry
+    def __init__(self, max_entries=SESSION_MEMORY_MAX):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None:
+                return None
+            data, expires = item
+            if expires <= time.time():
+                del self._data[sid]
+                return None
+            self._data.move_to_end(sid)
+            return data
+
+    def set(self, sid, data, ttl):
+        with self._lock:
+            self._data[sid] = (data, time.time() + ttl)
+            self._data.move_to_end(sid)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+# -------------------- Flask Session Interface --------------------
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, raw=None):
+        def on_update(self):
+            self.modified = True
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.raw = raw          # serialized form as loaded, to skip no-op writes
+        self.old_sid = None     # dropped from the store on save, see regenerate()
+        self.modified = False
+
+    def regenerate(self):
+        # Fresh id on login, so an id planted before authentication (fixation) is worthless
+        if self.sid is not None:
+            self.old_sid = self.sid
+        self.sid, self.raw = None, None
+        self.modified = True
+
+class ServerSideSessionInterface(SessionInterface):
+    def __init__(self, store, skip_prefixes=()):
+        self.store = store
+        self.skip_prefixes = tuple(skip_prefixes)   # paths served without a session (static files)
+
+    def open_session(self, app, request):
+        # Runs before routing, so static / upload hits are recognised by path
+        if self.skip_prefixes and request.path.startswith(self.skip_prefixes):
+            return ServerSideSession()
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            raw = self.store.get(sid)
+            if raw is not None:
+                try:
+                    return ServerSideSession(_serializer.loads(raw), sid=sid, raw=raw)
+                except ValueError:
+                    pass
+        # No cookie, unknown or expired id: start empty, id is minted on first write
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.old_sid:
+            self.store.delete(session.old_sid)
+            session.old_sid = None
+
+        if not session:
+            if session.sid and session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        raw = _serializer.dumps(dict(session))
+        ttl = app.permanent_session_lifetime.total_seconds()
+        new_sid = session.sid is None
+        if new_sid:
+            session.sid = secrets.token_urlsafe(32)
+
+        if raw != session.raw:
+            self.store.set(session.sid, raw, ttl)
+            session.raw = raw
+
+        if new_sid or session.permanent:
+            response.set_cookie(
+                name, session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain, path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+def make_session_interface(connect, skip_prefixes=()):
+    # `connect` returns a new sqlite3 connection to the app database
+    if SESSION_BACKEND == "memory":
+        return ServerSideSessionInterface(MemorySessionStore(), skip_prefixes)
+    return ServerSideSessionInterface(SQLiteSessionStore(connect), skip_prefixes)
@@ -0,0 +1,21 @@
+// profile-media.js  (complete-profile gallery, fetched after first paint)
+(function () {
+  const gallery = document.getElementById('profileGallery');
+  if (!gallery) return;
+
+  fetch(gallery.dataset.mediaUrl)
+    .then((response) => (response.ok ? response.json() : { images: [] }))
+    .then((media) => {
+      gallery.innerHTML = '';
+      media.images.forEach((src) => {
+        const img = document.createElement('img');
+        img.src = src;
+        img.alt = gallery.dataset.alt;
+        img.loading = 'lazy';
+        img.decoding = 'async';
+        img.className = gallery.dataset.imageClass;
+        gallery.appendChild(img);
+      });
+    })
+    .catch((err) => console.error('Failed to load photos', err));
+})();
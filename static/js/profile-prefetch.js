@@ -0,0 +1,39 @@
+// profile-prefetch.js  (warm complete-profile media for cards in view)
+(function () {
+  if (navigator.connection && navigator.connection.saveData) return;
+
+  const requested = new Set();
+
+  // Only the media JSON: opening the page itself counts against the daily
+  // view quota, so it is never fetched speculatively
+  function prefetch(link) {
+    const url = link.dataset.mediaUrl;
+    if (!url || requested.has(url)) return;
+    requested.add(url);
+    const hint = document.createElement('link');
+    hint.rel = 'prefetch';
+    hint.href = url;
+    document.head.appendChild(hint);
+  }
+
+  // Cards scrolled into (or near) view
+  if ('IntersectionObserver' in window) {
+    const observer = new IntersectionObserver((entries) => {
+      entries.forEach((entry) => {
+        if (entry.isIntersecting) {
+          prefetch(entry.target);
+          observer.unobserve(entry.target);
+        }
+      });
+    }, { rootMargin: '200px' });
+    document.querySelectorAll('.view-profile-btn').forEach((link) => observer.observe(link));
+  }
+
+  // Hover / keyboard focus is a stronger hint, and covers older browsers
+  ['pointerover', 'focusin'].forEach((type) => {
+    document.addEventListener(type, (event) => {
+      const link = event.target.closest && event.target.closest('.view-profile-btn');
+      if (link) prefetch(link);
+    });
+  });
+})();
@@ -0,0 +1,78 @@
+# test_chat_writer.py  (write-behind log: a bad record must not block the rest)
+#
+#   python -m pytest -q tests
+
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_workdir = tempfile.mkdtemp(prefix="test_chat_")
+os.environ["DATABASE_PATH"] = os.path.join(_workdir, "test.db")
+os.environ["CHAT_LOG_DIR"] = os.path.join(_workdir, "chat-log")
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+
+import chat_writer  # noqa: E402
+
+def _db(tmp_path):
+    path = str(tmp_path / "chat.db")
+    conn = sqlite3.connect(path)
+    chat_writer.init_writer_table(conn.cursor())
+    conn.execute("CREATE TABLE Messages (room TEXT NOT NULL, body TEXT NOT NULL)")
+    conn.commit()
+    conn.close()
+    return lambda: sqlite3.connect(path)
+
+def _write(cursor, records):
+    cursor.executemany("INSERT INTO Messages (room, body) VALUES (?, ?)", records)
+
+def _bodies(connect):
+    conn = connect()
+    rows = [r[0] for r in conn.execute("SELECT body FROM Messages ORDER BY rowid")]
+    conn.close()
+    return rows
+
+def _rejects(writer):
+    with open(os.path.join(writer.log_dir, "chat-rejects.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_bad_record_is_set_aside(tmp_path):
+    connect = _db(tmp_path)
+    writer = chat_writer.ChatWriter(connect, _write, log_dir=str(tmp_path / "log"), flush_interval=10)
+    writer.recover()
+    writer.submit("r", ["r", "before"])
+    writer.submit("r", ["r", {"x": 1}])
+    writer.submit("r", ["r", "after"])
+    writer.flush()
+    writer.submit("r", ["r", "next batch"])
+    writer.flush()
+
+    assert _bodies(connect) == ["before", "after", "next batch"]
+    assert not writer.has_pending("r")
+    assert [item["record"] for item in _rejects(writer)] == [["r", {"x": 1}]]
+
+def test_recover_skips_bad_record(tmp_path):
+    connect = _db(tmp_path)
+    log_dir = tmp_path / "log"
+    log_dir.mkdir()
+    (log_dir / "chat-000000000001.log").write_text(
+        '["r","ok"]\n["r",{"x":1}]\n["r",null]\n', encoding="utf-8")
+
+    writer = chat_writer.ChatWriter(connect, _write, log_dir=str(log_dir))
+    assert writer.recover() == 1
+    assert _bodies(connect) == ["ok"]
+    assert len(_rejects(writer)) == 2
+    assert not os.path.exists(log_dir / "chat-000000000001.log")
+
+def test_save_message_rejects_non_text():
+    import app
+    app.create_app(auto_migrate=True)
+    client = app.app.test_client()
+    resp = client.post("/save_message", json={
+        "Sender": "a", "Receiver": "b", "Message": {"x": 1}, "Room_ID": "a_b"})
+    assert resp.status_code == 400
+    assert not app.message_writer.has_pending("a_b")